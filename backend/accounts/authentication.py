@@ -0,0 +1,154 @@
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+# ----------------------------------
+# Cached user lookup for JWT auth
+# ----------------------------------
+# JWTAuthentication loads the User row on every request. Here the row comes
+# from a small per-process LRU first (AUTH_USER_LOCAL_CACHE_TTL, a few
+# seconds), then from the shared cache under a per-user version token, and
+# only then from the database. Saving or deleting a user swaps its version
+# token (see accounts.signals), which orphans the shared entry everywhere
+# and drops the local entry in this process; other processes notice once
+# their own local entry expires, i.e. within the local TTL.
+#
+# That only holds if the cache really is shared. With the per-process
+# LocMemCache default, another process would keep serving its own copy
+# for the full AUTH_USER_CACHE_TTL, so the shared tier is skipped there.
+#
+# The shared entry holds the user's field values, not a pickled User, and
+# leaves out the password hash unless CHECK_REVOKE_TOKEN compares against
+# it; anything that does read user.password then loads it from the database.
+
+USER_KEY = "accounts:user:{id}:{version}"
+VERSION_KEY = "accounts:user:{id}:version"
+
+
+class _LocalUserCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return user
+
+    def set(self, user_id, user, ttl):
+        with self._lock:
+            self._entries[user_id] = (user, time.monotonic() + ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+_local_users = _LocalUserCache(settings.AUTH_USER_LOCAL_CACHE_SIZE)
+
+
+def _user_version(user_id):
+    key = VERSION_KEY.format(id=user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def _cache_is_shared():
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache)
+
+
+def invalidate_cached_user(user_id):
+    cache.set(VERSION_KEY.format(id=user_id), uuid.uuid4().hex, None)
+    _local_users.discard(str(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that serves the user from cache when it can."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = str(validated_token[api_settings.USER_ID_CLAIM])
+        except KeyError as e:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            ) from e
+
+        user = _local_users.get(user_id)
+        if user is None:
+            if _cache_is_shared():
+                user = self._get_shared(user_id)
+            else:
+                user = self._get_from_db(user_id)
+            _local_users.set(user_id, user, settings.AUTH_USER_LOCAL_CACHE_TTL)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        # Each request gets its own instance, so nothing set on request.user
+        # leaks into the cached copy.
+        return copy.copy(user)
+
+    def _get_shared(self, user_id):
+        key = USER_KEY.format(id=user_id, version=_user_version(user_id))
+        fields = self._cached_fields()
+        values = cache.get(key)
+        if values is not None and len(values) == len(fields):
+            return self.user_model.from_db(DEFAULT_DB_ALIAS, fields, values)
+
+        user = self._get_from_db(user_id)
+        cache.set(
+            key, [getattr(user, f) for f in fields], settings.AUTH_USER_CACHE_TTL
+        )
+        return user
+
+    def _get_from_db(self, user_id):
+        try:
+            return self.user_model.objects.only(*self._cached_fields()).get(
+                **{api_settings.USER_ID_FIELD: user_id}
+            )
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(
+                _("User not found"), code="user_not_found"
+            ) from e
+
+    def _cached_fields(self):
+        return [
+            f.attname
+            for f in self.user_model._meta.concrete_fields
+            if f.attname != "password" or api_settings.CHECK_REVOKE_TOKEN
+        ]
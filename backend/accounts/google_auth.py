@@ -0,0 +1,63 @@
+import re
+import threading
+import time
+
+import requests as http
+from google.auth.transport import requests as google_requests
+from requests.adapters import HTTPAdapter
+
+
+# ----------------------------------
+# Google ID token verification transport
+# ----------------------------------
+# id_token.verify_oauth2_token() fetches Google's signing certificates on
+# every call. CachingRequest answers repeat GETs from memory for as long as
+# the response's Cache-Control max-age allows (Google serves the certs with
+# several hours of max-age) and sends the rest through one pooled session.
+
+MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+def _freshness(headers):
+    """Seconds a response may be reused for, per Cache-Control and Age."""
+    cache_control = headers.get("Cache-Control", "")
+    if "no-store" in cache_control or "no-cache" in cache_control:
+        return 0
+    match = MAX_AGE_RE.search(cache_control)
+    if not match:
+        return 0
+    try:
+        age = int(headers.get("Age", 0))
+    except ValueError:
+        age = 0
+    return int(match.group(1)) - age
+
+
+class CachingRequest(google_requests.Request):
+    def __init__(self, session=None):
+        if session is None:
+            session = http.Session()
+            session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+        super().__init__(session=session)
+        self._responses = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, url, method="GET", body=None, headers=None, **kwargs):
+        if method != "GET" or body is not None:
+            return super().__call__(url, method=method, body=body, headers=headers, **kwargs)
+
+        with self._lock:
+            cached = self._responses.get(url)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+
+        response = super().__call__(url, method=method, headers=headers, **kwargs)
+        if response.status == 200:
+            ttl = _freshness(response.headers)
+            if ttl > 0:
+                with self._lock:
+                    self._responses[url] = (response, time.monotonic() + ttl)
+        return response
+
+
+google_request = CachingRequest()
@@ -1,3 +1,197 @@
-from django.test import TestCase
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import IntegrityError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .authentication import USER_KEY, _local_users, _user_version
+from .google_auth import CachingRequest
+from .views import _create_google_user
+
+
+class UserCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("guest", password="pw")
+        self.client = APIClient()
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def me(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/accounts/me/")
+        self.user_queries = [
+            q["sql"] for q in queries.captured_queries if '"auth_user"' in q["sql"]
+        ]
+        return response
+
+    def shared_entry(self):
+        version = _user_version(self.user.id)
+        return cache.get(USER_KEY.format(id=self.user.id, version=version))
+
+
+class CachedJWTAuthenticationTests(UserCacheTestCase):
+    def test_warm_request_skips_the_user_query(self):
+        self.me()
+        self.assertEqual(len(self.user_queries), 1)
+
+        self.assertEqual(self.me().status_code, 200)
+        self.assertEqual(self.user_queries, [])
+
+    def test_staff_flag_change_applies_on_the_next_request(self):
+        self.assertFalse(self.me().data["is_staff"])
+
+        self.user.is_staff = True
+        self.user.save()
+
+        self.assertTrue(self.me().data["is_staff"])
+
+    def test_deactivated_user_is_rejected(self):
+        self.me()
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.me().status_code, 401)
+
+    def test_deleted_user_is_rejected(self):
+        self.me()
+
+        self.user.delete()
+
+        self.assertEqual(self.me().status_code, 401)
+
+    def test_per_process_cache_is_not_used_as_the_shared_tier(self):
+        # Another process could never see this process's version swap
+        self.me()
+        self.assertIsNone(self.shared_entry())
+
+
+class SharedUserCacheTests(UserCacheTestCase):
+    def setUp(self):
+        location = tempfile.TemporaryDirectory()
+        self.addCleanup(location.cleanup)
+        caches = override_settings(CACHES={"default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": location.name,
+        }})
+        caches.enable()
+        self.addCleanup(caches.disable)
+        super().setUp()
+
+    def other_process(self):
+        # A process that has the shared cache but nothing local yet
+        _local_users.discard(str(self.user.id))
+
+    def test_warm_shared_entry_skips_the_user_query(self):
+        self.me()
+        self.other_process()
+
+        self.assertEqual(self.me().data["username"], "guest")
+        self.assertEqual(self.user_queries, [])
+
+    def test_shared_entry_leaves_out_the_password_hash(self):
+        self.me()
+
+        self.assertIsNotNone(self.shared_entry())
+        self.assertNotIn(self.user.password, self.shared_entry())
+
+    def test_other_processes_see_the_change_once_their_local_entry_expires(self):
+        self.me()
+        self.user.is_staff = True
+        self.user.save()
+        self.other_process()
+
+        self.assertTrue(self.me().data["is_staff"])
+
+    def test_other_processes_reject_a_deactivated_user(self):
+        self.me()
+        self.user.is_active = False
+        self.user.save()
+        self.other_process()
+
+        self.assertEqual(self.me().status_code, 401)
+
+
+class GoogleLoginTests(TestCase):
+    def login(self, email="alice@example.com", name="Alice Liddell"):
+        with mock.patch(
+            "accounts.views.id_token.verify_oauth2_token",
+            return_value={"email": email, "name": name},
+        ):
+            return APIClient().post("/api/accounts/google/", {"token": "t"}, format="json")
+
+    def test_creates_the_user_once(self):
+        self.assertEqual(self.login().status_code, 200)
+        self.assertEqual(self.login().status_code, 200)
+
+        user = User.objects.get()
+        self.assertEqual(
+            (user.username, user.first_name, user.last_name),
+            ("alice", "Alice", "Liddell"),
+        )
+
+    def test_taken_username_gets_a_suffix(self):
+        User.objects.create_user("alice", email="other@example.com")
+        User.objects.create_user("alice_2", email="another@example.com")
+
+        # One lookup for every taken name, then the INSERT in a savepoint
+        with self.assertNumQueries(4):
+            user = _create_google_user("alice@example.com", "Alice")
+
+        self.assertRegex(user.username, r"^alice_[0-9a-f]{5}$")
+
+    def test_concurrent_login_for_the_same_email_wins(self):
+        # Created by another request between our lookup and our insert
+        existing = User.objects.create_user("alice_web", email="alice@example.com")
+
+        with mock.patch.object(User.objects, "create", side_effect=IntegrityError):
+            user = _create_google_user("alice@example.com", "Alice")
+
+        self.assertEqual(user, existing)
+
+    def test_invalid_token_is_rejected(self):
+        with mock.patch(
+            "accounts.views.id_token.verify_oauth2_token", side_effect=ValueError
+        ):
+            response = APIClient().post("/api/accounts/google/", {"token": "t"})
+        self.assertEqual(response.status_code, 400)
+
+
+class CachingRequestTests(TestCase):
+    URL = "https://www.googleapis.com/oauth2/v1/certs"
+
+    def request(self, headers):
+        session = mock.Mock()
+        session.request.return_value = mock.Mock(
+            status_code=200, headers=headers, content=b"{}"
+        )
+        return CachingRequest(session=session), session
+
+    def test_reuses_the_certs_while_fresh(self):
+        request, session = self.request(
+            {"Cache-Control": "public, max-age=100", "Age": "40"}
+        )
+
+        with mock.patch("accounts.google_auth.time.monotonic", return_value=1000):
+            request(self.URL)
+            request(self.URL)
+        self.assertEqual(session.request.call_count, 1)
+
+        # max-age less the Age the response already had
+        with mock.patch("accounts.google_auth.time.monotonic", return_value=1061):
+            request(self.URL)
+        self.assertEqual(session.request.call_count, 2)
+
+    def test_does_not_cache_no_store(self):
+        request, session = self.request({"Cache-Control": "no-store, max-age=100"})
+
+        request(self.URL)
+        request(self.URL)
+
+        self.assertEqual(session.request.call_count, 2)
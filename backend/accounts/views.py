@@ -4,16 +4,49 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
 
 from rest_framework_simplejwt.tokens import RefreshToken
 from google.oauth2 import id_token
-from google.auth.transport import requests
 import os
 import uuid
 
+from .google_auth import google_request
 from .serializers import RegisterSerializer
 
 
+def _create_google_user(email, full_name, attempts=5):
+    base_username = email.split("@")[0]
+
+    # One query for every username this base could collide with
+    taken = set(
+        User.objects.filter(username__startswith=base_username)
+        .values_list("username", flat=True)
+    )
+    username = base_username
+
+    for _ in range(attempts):
+        while username in taken:
+            username = f"{base_username}_{uuid.uuid4().hex[:5]}"
+        try:
+            with transaction.atomic():
+                return User.objects.create(
+                    username=username,
+                    email=email,
+                    first_name=full_name.split(" ")[0],
+                    last_name=" ".join(full_name.split(" ")[1:]),
+                )
+        except IntegrityError:
+            # Lost a race for this username (or a concurrent login for the
+            # same email created the account first)
+            user = User.objects.filter(email=email).first()
+            if user:
+                return user
+            taken.add(username)
+
+    raise IntegrityError(f"Could not allocate a username for {email}")
+
+
 class GoogleLoginAPIView(APIView):
     permission_classes = [AllowAny]
 
@@ -26,7 +59,7 @@ class GoogleLoginAPIView(APIView):
         try:
             idinfo = id_token.verify_oauth2_token(
                 token,
-                requests.Request(),
+                google_request,
                 os.getenv("GOOGLE_CLIENT_ID"),
             )
 
@@ -36,19 +69,7 @@ class GoogleLoginAPIView(APIView):
             user = User.objects.filter(email=email).first()
 
             if not user:
-                base_username = email.split("@")[0]
-                username = base_username
-
-                # Ensure unique username
-                while User.objects.filter(username=username).exists():
-                    username = f"{base_username}_{uuid.uuid4().hex[:5]}"
-
-                user = User.objects.create(
-                    username=username,
-                    email=email,
-                    first_name=full_name.split(" ")[0],
-                    last_name=" ".join(full_name.split(" ")[1:]),
-                )
+                user = _create_google_user(email, full_name)
 
             refresh = RefreshToken.for_user(user)
 
@@ -103,6 +103,28 @@ DATABASES = {
     "default": dj_database_url.config(default=os.getenv("DATABASE_URL"))
 }
 
+# SQLite (local dev): take the write lock when a transaction starts, so
+# concurrent `run_workers` threads wait for it instead of failing with
+# "database is locked".
+if DATABASES["default"].get("ENGINE") == "django.db.backends.sqlite3":
+    DATABASES["default"].setdefault("OPTIONS", {})["transaction_mode"] = "IMMEDIATE"
+
+# =========================
+# CACHE
+# =========================
+# Local memory by default; point CACHE_BACKEND / CACHE_LOCATION at a shared
+# backend (e.g. Redis or Memcached) when running more than one process.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+    }
+}
+
+EVENT_CACHE_TTL = int(os.getenv("EVENT_CACHE_TTL", "60"))
+
 # =========================
 # AUTH
 # =========================
@@ -143,10 +165,15 @@ SIMPLE_JWT = {
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "accounts.authentication.CachedJWTAuthentication",
     )
 }
 
+# User rows behind JWTs are cached (accounts.authentication)
+AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL", "300"))  # shared cache, seconds
+AUTH_USER_LOCAL_CACHE_TTL = int(os.getenv("AUTH_USER_LOCAL_CACHE_TTL", "5"))  # per process
+AUTH_USER_LOCAL_CACHE_SIZE = int(os.getenv("AUTH_USER_LOCAL_CACHE_SIZE", "1024"))
+
 # =========================
 # MEDIA (Cloudinary)
 # =========================
@@ -156,7 +183,18 @@ CLOUDINARY_STORAGE = {
     "API_SECRET": os.getenv("CLOUDINARY_API_SECRET"),
 }
 
-DEFAULT_FILE_STORAGE = "cloudinary_storage.storage.MediaCloudinaryStorage"
+# STORAGES replaces DEFAULT_FILE_STORAGE, which Django 5.1 stopped reading
+STORAGES = {
+    "default": {"BACKEND": "cloudinary_storage.storage.MediaCloudinaryStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    # Raw posters waiting for the worker; must be reachable from every
+    # process (see events.posters)
+    "poster_uploads": {
+        "BACKEND": os.getenv(
+            "POSTER_UPLOAD_STORAGE", "cloudinary_storage.storage.RawMediaCloudinaryStorage"
+        ),
+    },
+}
 
 # =========================
 # STATIC
@@ -171,6 +209,28 @@ MIDDLEWARE.insert(
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Stream every upload straight to a temp file instead of buffering in memory
+FILE_UPLOAD_HANDLERS = [
+    "django.core.files.uploadhandler.TemporaryFileUploadHandler",
+]
+
+# Event posters are processed by `manage.py run_workers` (the Procfile's worker)
+# "events.posters.LocalPosterStorage" keeps posters on local disk (tests / dev)
+POSTER_STORAGE = os.getenv("POSTER_STORAGE", "events.posters.CloudinaryPosterStorage")
+POSTER_MAX_DIMENSION = int(os.getenv("POSTER_MAX_DIMENSION", "2000"))
+POSTER_MAX_BYTES = int(os.getenv("POSTER_MAX_BYTES", str(10 * 1024 * 1024)))
+
+# Live updates over SSE (events.live); InProcessBroker reaches subscribers in
+# the same process only
+LIVE_BROKER = os.getenv("LIVE_BROKER", "events.live.InProcessBroker")
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "100"))  # per subscriber
+LIVE_KEEPALIVE = int(os.getenv("LIVE_KEEPALIVE", "15"))  # seconds
+
+# Background task queue (events.tasks)
+TASK_VISIBILITY_TIMEOUT = int(os.getenv("TASK_VISIBILITY_TIMEOUT", "300"))  # seconds
+TASK_RETRY_BACKOFF = int(os.getenv("TASK_RETRY_BACKOFF", "10"))  # seconds, doubled per attempt
+TASK_RETRY_BACKOFF_MAX = int(os.getenv("TASK_RETRY_BACKOFF_MAX", "3600"))
+
 # =========================
 # CORS
 # =========================
@@ -190,3 +250,27 @@ import os
 
 RAZORPAY_KEY_ID = os.getenv("RAZORPAY_KEY_ID", "")
 RAZORPAY_KEY_SECRET = os.getenv("RAZORPAY_KEY_SECRET", "")
+RAZORPAY_WEBHOOK_SECRET = os.getenv("RAZORPAY_WEBHOOK_SECRET", "")
+
+# Swap for "events.payments.FakeGateway" in load tests / local dev
+PAYMENT_GATEWAY = os.getenv("PAYMENT_GATEWAY", "events.payments.RazorpayGateway")
+PAYMENT_GATEWAY_CONNECT_TIMEOUT = float(os.getenv("PAYMENT_GATEWAY_CONNECT_TIMEOUT", "3.05"))
+PAYMENT_GATEWAY_READ_TIMEOUT = float(os.getenv("PAYMENT_GATEWAY_READ_TIMEOUT", "10"))
+PAYMENT_GATEWAY_POOL_SIZE = int(os.getenv("PAYMENT_GATEWAY_POOL_SIZE", "20"))
+PAYMENT_GATEWAY_RETRIES = int(os.getenv("PAYMENT_GATEWAY_RETRIES", "2"))
+
+# How long a paid-event registration holds its seat while awaiting payment
+SEAT_HOLD_TTL = timedelta(minutes=int(os.getenv("SEAT_HOLD_MINUTES", "15")))
+
+# An unpaid CREATED order younger than this is handed back instead of
+# creating a new one for the same registration
+PAYMENT_ORDER_REUSE_WINDOW = timedelta(
+    minutes=int(os.getenv("PAYMENT_ORDER_REUSE_MINUTES", "15"))
+)
+
+# Scanner roster versions are handed out this far in the past, so a
+# registration that commits after a snapshot but with an earlier updated_at
+# still shows up in the next delta (a few rows may repeat; devices upsert)
+ROSTER_SYNC_OVERLAP = timedelta(
+    seconds=int(os.getenv("ROSTER_SYNC_OVERLAP_SECONDS", "60"))
+)
@@ -11,6 +11,7 @@ class EventAdmin(admin.ModelAdmin):
         "location",
         "date",
         "capacity",
+        "seats_taken",
         "approved",
         "created_at",
     )
@@ -29,3 +30,35 @@ class EventRegistrationAdmin(admin.ModelAdmin):
         "is_scanned",
         "registered_at",
     )
+
+from .models import Task
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = (
+        "name",
+        "status",
+        "attempts",
+        "run_after",
+        "updated_at",
+    )
+
+    list_filter = ("status", "name")
+    ordering = ("-created_at",)
+
+from .models import EventDailyStats
+
+@admin.register(EventDailyStats)
+class EventDailyStatsAdmin(admin.ModelAdmin):
+    list_display = (
+        "event",
+        "day",
+        "registrations",
+        "paid_registrations",
+        "checkins",
+        "revenue",
+        "abandoned_holds",
+    )
+
+    list_filter = ("day",)
+    ordering = ("-day",)
@@ -0,0 +1,147 @@
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .live import HOST_ONLY_FIELDS, publish_deltas
+from .models import EventDailyStats, EventRegistration, Payment
+
+
+# ----------------------------------
+# Host analytics rollups
+# ----------------------------------
+# EventDailyStats holds one row per event and day. Every write path that
+# changes what the rollup counts (joins, imports, payments, scans, the hold
+# reaper) feeds a StatsDelta and applies it in the same transaction: one
+# INSERT ... ON CONFLICT DO NOTHING for the rows it touches plus one
+# F()-expression UPDATE per row. Days are in the project TIME_ZONE.
+# The same deltas are pushed to live subscribers (events.live) on commit;
+# every registration holds a seat until its hold is abandoned, so
+# registrations less abandoned_holds is the seats_taken delta.
+#
+# registrations counts joins and is never decremented: a hold the reaper
+# frees is added to abandoned_holds instead (on the day of the join), so
+# paid_registrations / registrations stays a join-to-paid conversion.
+#
+# Anything that bypasses those paths (admin edits, cascade deletes) is
+# repaired by `manage.py rebuild_event_stats`, which recomputes rows from
+# the raw tables with the same bucketing as rebuild_stats() below.
+
+STAT_FIELDS = (
+    "registrations", "paid_registrations", "checkins", "revenue", "abandoned_holds",
+)
+
+
+class StatsDelta:
+    def __init__(self):
+        self._deltas = defaultdict(Counter)
+
+    def add(self, event_id, when, **counts):
+        day = timezone.localdate(when)
+        self._deltas[(event_id, day)].update(counts)
+        return self
+
+    def apply(self):
+        deltas = {key: counts for key, counts in self._deltas.items() if any(counts.values())}
+        self._deltas.clear()
+        if not deltas:
+            return
+
+        with transaction.atomic():
+            EventDailyStats.objects.bulk_create(
+                [EventDailyStats(event_id=event_id, day=day) for event_id, day in deltas],
+                ignore_conflicts=True,
+            )
+            for (event_id, day), counts in deltas.items():
+                EventDailyStats.objects.filter(event_id=event_id, day=day).update(
+                    **{
+                        field: F(field) + value
+                        for field, value in counts.items()
+                        if value
+                    }
+                )
+
+            per_event = defaultdict(Counter)
+            for (event_id, _), counts in deltas.items():
+                per_event[event_id].update(counts)
+            for event_id, counts in per_event.items():
+                publish_deltas(event_id, {
+                    "seats_taken": counts["registrations"] - counts["abandoned_holds"],
+                    **{field: counts[field] for field in HOST_ONLY_FIELDS},
+                })
+
+
+def record(event_id, when, **counts):
+    """Apply a single rollup change right away."""
+    StatsDelta().add(event_id, when, **counts).apply()
+
+
+def rebuild_stats(event_ids=None):
+    """
+    Recompute rollup rows from the raw tables (abandoned_holds is kept from
+    the existing rows); returns rows written.
+    """
+    registrations = EventRegistration.objects.all()
+    scans = EventRegistration.objects.filter(is_scanned=True, scanned_at__isnull=False)
+    payments = Payment.objects.filter(status="PAID")
+    existing = EventDailyStats.objects.all()
+    if event_ids is not None:
+        registrations = registrations.filter(event_id__in=event_ids)
+        scans = scans.filter(event_id__in=event_ids)
+        payments = payments.filter(event_id__in=event_ids)
+        existing = existing.filter(event_id__in=event_ids)
+
+    rows = defaultdict(Counter)
+    for row in (
+        registrations.annotate(day=TruncDate("registered_at"))
+        .values("event_id", "day")
+        .annotate(
+            registrations=Count("id"),
+            paid_registrations=Count("id", filter=Q(is_paid=True)),
+        )
+        .order_by()
+    ):
+        rows[(row["event_id"], row["day"])].update(
+            registrations=row["registrations"],
+            paid_registrations=row["paid_registrations"],
+        )
+    for row in (
+        scans.annotate(day=TruncDate("scanned_at"))
+        .values("event_id", "day")
+        .annotate(checkins=Count("id"))
+        .order_by()
+    ):
+        rows[(row["event_id"], row["day"])]["checkins"] += row["checkins"]
+    for row in (
+        payments.annotate(day=TruncDate("created_at"))
+        .values("event_id", "day")
+        .annotate(revenue=Sum("amount"))
+        .order_by()
+    ):
+        rows[(row["event_id"], row["day"])]["revenue"] += row["revenue"]
+
+    with transaction.atomic():
+        # Reaped holds leave no row behind, so they are carried over; they
+        # were joins too
+        for event_id, day, abandoned in existing.filter(
+            abandoned_holds__gt=0
+        ).values_list("event_id", "day", "abandoned_holds"):
+            rows[(event_id, day)].update(
+                registrations=abandoned, abandoned_holds=abandoned
+            )
+
+        existing.delete()
+        EventDailyStats.objects.bulk_create(
+            [
+                EventDailyStats(
+                    event_id=event_id,
+                    day=day,
+                    **{field: counts[field] for field in STAT_FIELDS},
+                )
+                for (event_id, day), counts in rows.items()
+            ],
+            batch_size=1000,
+        )
+    return len(rows)
@@ -1,5 +1,18 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.models.signals import post_migrate
+
+
+def _restore_search_triggers(sender, using, **kwargs):
+    from .search import ensure_sqlite_fts_triggers
+
+    ensure_sqlite_fts_triggers(connections[using])
 
 
 class EventsConfig(AppConfig):
     name = 'events'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        post_migrate.connect(_restore_search_triggers, sender=self)
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+
+# ----------------------------------
+# Public event listing / detail cache
+# ----------------------------------
+# Every cached representation is keyed on a shared version token. Any write
+# that can change what the public endpoints return swaps the token, which
+# orphans all old entries at once (they then age out via the TTL).
+
+VERSION_KEY = "events:public:version"
+CACHE_TTL = getattr(settings, "EVENT_CACHE_TTL", 60)
+
+
+def _current_version():
+    state = cache.get(VERSION_KEY)
+    if state is None:
+        cache.add(VERSION_KEY, _new_version(), None)
+        state = cache.get(VERSION_KEY) or _new_version()
+    return state
+
+
+def _new_version():
+    return {"token": uuid.uuid4().hex, "modified": int(time.time())}
+
+
+def invalidate_event_cache():
+    cache.set(VERSION_KEY, _new_version(), None)
+
+
+def _not_modified(request, entry):
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+    if if_none_match:
+        etags = parse_etags(if_none_match)
+        return "*" in etags or entry["etag"] in etags
+
+    if_modified_since = parse_http_date_safe(
+        request.META.get("HTTP_IF_MODIFIED_SINCE", "")
+    )
+    return if_modified_since is not None and entry["last_modified"] <= if_modified_since
+
+
+def cached_response(request, compute):
+    """
+    Serve `compute()`'s data from the cache, with ETag / Last-Modified
+    validators so clients holding a current copy get a 304.
+    """
+    state = _current_version()
+    key = "events:public:%s:%s%s" % (
+        state["token"],
+        request.get_host(),
+        request.get_full_path(),
+    )
+
+    entry = cache.get(key)
+    if entry is None:
+        response = compute()
+        if response.status_code != 200:
+            return response
+
+        body = json.dumps(response.data, cls=JSONEncoder, sort_keys=True)
+        entry = {
+            "data": response.data,
+            "etag": quote_etag(hashlib.md5(body.encode()).hexdigest()),
+            "last_modified": state["modified"],
+        }
+        cache.set(key, entry, CACHE_TTL)
+
+    if _not_modified(request, entry):
+        response = Response(status=304)
+    else:
+        response = Response(entry["data"])
+
+    response["ETag"] = entry["etag"]
+    response["Last-Modified"] = http_date(entry["last_modified"])
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,34 @@
+# ----------------------------------
+# Sparse fieldsets (?fields=)
+# ----------------------------------
+# List endpoints accept ?fields=title,date,image to return only those keys.
+# The same selection drives the queryset projection: each output field maps
+# to the columns it needs, everything else is left out of the SELECT (and
+# count annotations are skipped entirely when not asked for).
+
+
+def parse_fields(request, available):
+    """
+    The set of output fields requested with ?fields=, or None for all of
+    them. Raises ValueError naming any field not in `available`.
+    """
+    raw = request.query_params.get("fields")
+    if not raw:
+        return None
+
+    fields = {name.strip() for name in raw.split(",") if name.strip()}
+    unknown = sorted(fields - set(available))
+    if unknown:
+        raise ValueError(", ".join(unknown))
+    return fields
+
+
+def project(queryset, fields, columns, always=("id",)):
+    """
+    .only() the columns behind `fields`; `columns` maps an output field to
+    the model columns it reads (default: the field of the same name).
+    """
+    needed = set(always)
+    for name in fields:
+        needed.update(columns.get(name, (name,)))
+    return queryset.only(*needed)
@@ -0,0 +1,128 @@
+import math
+
+from django.db.models import Q
+
+
+# ----------------------------------
+# Geohash helpers for "events near me"
+# ----------------------------------
+# Event.geohash is an indexed 12-character geohash. A radius query picks the
+# precision whose cells are at least as large as the radius, so the circle
+# lies within the centre cell and its 8 neighbours; those 9 prefixes become
+# index range scans, and exact distances are computed on the survivors only.
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_LENGTH = 12
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+
+def encode(lat, lng, precision=GEOHASH_LENGTH):
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(chars) < precision:
+        rng, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(chars)
+
+
+def cell_size(precision):
+    """(lat_degrees, lng_degrees) spanned by a geohash cell of `precision`."""
+    total_bits = precision * 5
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = (
+        math.sin(d_phi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def covering_prefixes(lat, lng, radius_km):
+    """Geohash prefixes whose cells cover the circle, or None if it's too big."""
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+
+    for precision in range(GEOHASH_LENGTH, 0, -1):
+        lat_deg, lng_deg = cell_size(precision)
+        height_km = lat_deg * KM_PER_DEGREE
+        width_km = lng_deg * KM_PER_DEGREE * cos_lat
+        if min(height_km, width_km) >= radius_km:
+            break
+    else:
+        return None
+
+    prefixes = set()
+    for d_lat in (-lat_deg, 0, lat_deg):
+        for d_lng in (-lng_deg, 0, lng_deg):
+            cell_lat = min(max(lat + d_lat, -90.0), 90.0)
+            cell_lng = (lng + d_lng + 180.0) % 360.0 - 180.0
+            prefixes.add(encode(cell_lat, cell_lng, precision))
+    return prefixes
+
+
+def bounding_box(lat, lng, radius_km):
+    d_lat = radius_km / KM_PER_DEGREE
+    d_lng = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+    return lat - d_lat, lat + d_lat, lng - d_lng, lng + d_lng
+
+
+def nearby_filter(lat, lng, radius_km):
+    """Q object narrowing events to candidates within `radius_km`."""
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    candidates = Q(latitude__gte=min_lat, latitude__lte=max_lat)
+
+    # Skip the longitude clamp when the box crosses the antimeridian; the
+    # geohash prefixes and the exact distance check still apply.
+    if -180.0 <= min_lng and max_lng <= 180.0:
+        candidates &= Q(longitude__gte=min_lng, longitude__lte=max_lng)
+
+    prefixes = covering_prefixes(lat, lng, radius_km)
+    if prefixes:
+        cells = Q()
+        for prefix in prefixes:
+            cells |= prefix_range(prefix)
+        candidates &= cells
+
+    return candidates
+
+
+def prefix_range(prefix):
+    """
+    Q for geohashes starting with `prefix`, as a plain range.
+
+    startswith compiles to LIKE, which a default b-tree index can't serve
+    under a non-C collation on PostgreSQL; >= / < can. The upper bound is
+    the next prefix in geohash order (digits, then lowercase letters, so
+    the same in every collation).
+    """
+    stem = prefix.rstrip(BASE32[-1])
+    if not stem:
+        return Q(geohash__gte=prefix)
+    upper = stem[:-1] + BASE32[BASE32.index(stem[-1]) + 1]
+    return Q(geohash__gte=prefix, geohash__lt=upper)
@@ -0,0 +1,109 @@
+from django.db import transaction
+from django.db.models import Case, Exists, F, OuterRef, PositiveIntegerField, When
+from django.utils import timezone
+
+from .analytics import StatsDelta, record
+from .models import Event, EventRegistration, Payment, releasing_seats_in_bulk
+
+
+# ----------------------------------
+# Seat holds for paid registrations
+# ----------------------------------
+# An unpaid registration keeps its seat until hold_expires_at. Expired holds
+# are deleted a batch at a time (one DELETE), and the seats go back to their
+# events with one CASE UPDATE per batch (the per-row post_delete release in
+# events.signals stands down meanwhile).
+#
+# Issuing a gateway order restarts the hold, so a payer gets the full window.
+# A hold whose payment is already PAID is never reaped, and a capture that
+# still arrives after its hold was reaped goes through rebook_late_payment().
+
+
+def release_expired_holds(batch_size=1000, event_id=None):
+    """Release expired unpaid holds; returns the number of seats freed."""
+    released = 0
+
+    while True:
+        now = timezone.now()
+        with transaction.atomic():
+            captured = Payment.objects.filter(
+                user_id=OuterRef("user_id"), event_id=OuterRef("event_id"), status="PAID"
+            )
+            expired = EventRegistration.objects.select_for_update(skip_locked=True).filter(
+                ~Exists(captured), is_paid=False, hold_expires_at__lte=now
+            )
+            if event_id is not None:
+                expired = expired.filter(event_id=event_id)
+
+            rows = list(
+                expired.values_list("id", "event_id", "registered_at")[:batch_size]
+            )
+            if not rows:
+                break
+
+            per_event = {}
+            stats = StatsDelta()
+            for _, row_event_id, registered_at in rows:
+                per_event[row_event_id] = per_event.get(row_event_id, 0) + 1
+                stats.add(row_event_id, registered_at, abandoned_holds=1)
+
+            token = releasing_seats_in_bulk.set(True)
+            try:
+                EventRegistration.objects.filter(
+                    id__in=[row_id for row_id, _, _ in rows], is_paid=False
+                ).delete()
+            finally:
+                releasing_seats_in_bulk.reset(token)
+
+            # Event rows before stats rows, the order join_event and the
+            # payment paths lock them in
+            Event.objects.filter(id__in=per_event).update(
+                seats_taken=Case(
+                    *[
+                        When(id=row_event_id, then=F("seats_taken") - count)
+                        for row_event_id, count in per_event.items()
+                    ],
+                    default=F("seats_taken"),
+                    output_field=PositiveIntegerField(),
+                )
+            )
+            stats.apply()
+
+        released += len(rows)
+        if len(rows) < batch_size:
+            break
+
+    return released
+
+
+def rebook_late_payment(payment):
+    """
+    Settle a PAID payment whose registration was reaped before the capture
+    came in: register the payer again if the event still has a seat,
+    otherwise mark the payment REFUND_DUE. Returns True when rebooked.
+    """
+    event = Event(id=payment.event_id)
+
+    with transaction.atomic():
+        if event.claim_seat() or (
+            release_expired_holds(event_id=event.id) and event.claim_seat()
+        ):
+            registration = EventRegistration.objects.create(
+                user_id=payment.user_id,
+                event_id=payment.event_id,
+                is_paid=True,
+                is_approved=True,
+            )
+            payment.registration = registration
+            Payment.objects.filter(id=payment.id).update(registration=registration)
+            record(
+                event.id,
+                registration.registered_at,
+                registrations=1,
+                paid_registrations=1,
+            )
+            return True
+
+        payment.status = "REFUND_DUE"
+        Payment.objects.filter(id=payment.id).update(status="REFUND_DUE")
+        return False
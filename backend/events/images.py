@@ -0,0 +1,61 @@
+from functools import lru_cache
+
+from cloudinary import CloudinaryResource
+
+
+# ----------------------------------
+# Cloudinary poster URLs
+# ----------------------------------
+# Building a Cloudinary URL means re-deriving the transformation string and
+# signature on every call; for a given public id and version the result never
+# changes, so it is memoized per process. The fixed variants below are also
+# stored on Event.image_variants when the poster is saved.
+
+VARIANTS = {
+    "thumb": {
+        "width": 200, "height": 200, "crop": "fill", "gravity": "auto",
+        "quality": "auto", "fetch_format": "auto",
+    },
+    "card": {
+        "width": 640, "height": 360, "crop": "fill", "gravity": "auto",
+        "quality": "auto", "fetch_format": "auto",
+    },
+    "full": {
+        "width": 1600, "crop": "limit",
+        "quality": "auto", "fetch_format": "auto",
+    },
+}
+
+
+@lru_cache(maxsize=4096)
+def _build_url(public_id, version, fmt, resource_type, upload_type, variant):
+    resource = CloudinaryResource(
+        public_id,
+        format=fmt,
+        version=version,
+        type=upload_type,
+        resource_type=resource_type,
+    )
+    return resource.build_url(**VARIANTS.get(variant, {}))
+
+
+def image_url(image, variant=None):
+    """URL of a CloudinaryField value; the untransformed original by default."""
+    if not image:
+        return None
+    if not isinstance(image, CloudinaryResource):
+        return image.url
+    return _build_url(
+        image.public_id,
+        image.version,
+        image.format,
+        image.resource_type,
+        image.type,
+        variant,
+    )
+
+
+def build_variants(image):
+    if not image:
+        return {}
+    return {name: image_url(image, name) for name in VARIANTS}
@@ -0,0 +1,200 @@
+import csv
+import json
+import uuid
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .analytics import record
+from .cache import invalidate_event_cache
+from .holds import release_expired_holds
+from .models import Event, EventRegistration
+
+
+# ----------------------------------
+# Bulk attendee import (comp tickets)
+# ----------------------------------
+# Rows are consumed a batch at a time from a streamed CSV / NDJSON source.
+# Per batch: one query per identifier kind to resolve users, then, with the
+# event row locked, one query for existing registrations, one
+# bulk_create(ignore_conflicts=True), one query to see which rows actually
+# went in, one UPDATE of seats_taken and the analytics rollup. Capacity is
+# checked once per batch against the locked row, so imports and join_event
+# can't oversell.
+
+IMPORT_BATCH_SIZE = 1000
+HEADER_CELLS = {"username", "email", "user", "identifier"}
+
+REGISTERED = "registered"
+ALREADY_REGISTERED = "already_registered"
+DUPLICATE = "duplicate"
+NOT_FOUND = "not_found"
+INVALID = "invalid"
+IS_HOST = "is_host"
+FULL = "full"
+
+
+def _decoded(lines):
+    for line in lines:
+        yield line.decode("utf-8-sig") if isinstance(line, bytes) else line
+
+
+def parse_csv(lines):
+    """Yield (row_number, identifier) from CSV lines; a header row is skipped."""
+    for row_number, row in enumerate(csv.reader(_decoded(lines)), start=1):
+        cells = [cell.strip() for cell in row if cell.strip()]
+        if row_number == 1 and cells and cells[0].lower() in HEADER_CELLS:
+            continue
+        if not row:
+            continue
+        yield row_number, cells[0] if cells else ""
+
+
+def parse_ndjson(lines):
+    """Yield (row_number, identifier) from NDJSON: a string or {"username"|"email": ...}."""
+    for row_number, line in enumerate(_decoded(lines), start=1):
+        if not line.strip():
+            continue
+        try:
+            value = json.loads(line)
+        except ValueError:
+            yield row_number, ""
+            continue
+        if isinstance(value, dict):
+            value = value.get("username") or value.get("email")
+        yield row_number, value.strip() if isinstance(value, str) else ""
+
+
+def _resolve_users(identifiers):
+    """Map each identifier to a user id, one query per identifier kind."""
+    emails = {i.lower() for i in identifiers if "@" in i}
+    usernames = {i for i in identifiers if i and "@" not in i}
+
+    resolved = {}
+    if usernames:
+        resolved.update(
+            User.objects.filter(username__in=usernames).values_list("username", "id")
+        )
+    if emails:
+        # Emails match case-insensitively. Several accounts can share an
+        # email; the oldest one wins.
+        for email, user_id in (
+            User.objects.annotate(email_lower=Lower("email"))
+            .filter(email_lower__in=emails)
+            .order_by("-id")
+            .values_list("email_lower", "id")
+        ):
+            resolved[email] = user_id
+    return resolved
+
+
+def import_attendees(event, rows, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Register the users named in `rows` for `event` as comp tickets (paid and
+    approved, no payment). Yields one result dict per row, in input order.
+    """
+    rows = iter(rows)
+    seen = set()
+    inserted_total = 0
+
+    # Seats tied up in abandoned holds count as free for the import
+    release_expired_holds(event_id=event.id)
+
+    while batch := list(islice(rows, batch_size)):
+        results, inserted = _import_batch(event, batch, seen)
+        inserted_total += inserted
+        yield from results
+
+    if inserted_total:
+        invalidate_event_cache()
+
+
+def _import_batch(event, batch, seen):
+    resolved = _resolve_users({identifier for _, identifier in batch})
+
+    results = []
+    wanted = {}
+    for row_number, identifier in batch:
+        result = {"row": row_number, "identifier": identifier, "result": None}
+        results.append(result)
+
+        key = identifier.lower() if "@" in identifier else identifier
+        user_id = resolved.get(key)
+        if not identifier:
+            result["result"] = INVALID
+        elif user_id is None:
+            result["result"] = NOT_FOUND
+        elif user_id == event.host_id:
+            result["result"] = IS_HOST
+        elif user_id in seen:
+            result["result"] = DUPLICATE
+        else:
+            seen.add(user_id)
+            wanted[user_id] = result
+
+    if not wanted:
+        return results, 0
+
+    with transaction.atomic():
+        locked = Event.objects.select_for_update().only(
+            "id", "capacity", "seats_taken"
+        ).get(id=event.id)
+
+        existing = set(
+            EventRegistration.objects.filter(
+                event_id=event.id, user_id__in=wanted
+            ).values_list("user_id", flat=True)
+        )
+        for user_id in existing:
+            wanted.pop(user_id)["result"] = ALREADY_REGISTERED
+
+        free = max(locked.capacity - locked.seats_taken, 0)
+        to_create = {}
+        for user_id, result in wanted.items():
+            if len(to_create) < free:
+                to_create[uuid.uuid4()] = (user_id, result)
+            else:
+                result["result"] = FULL
+
+        if not to_create:
+            return results, 0
+
+        EventRegistration.objects.bulk_create(
+            [
+                EventRegistration(
+                    event_id=event.id,
+                    user_id=user_id,
+                    qr_token=token,
+                    is_paid=True,
+                    is_approved=True,
+                )
+                for token, (user_id, _) in to_create.items()
+            ],
+            ignore_conflicts=True,
+        )
+
+        # ignore_conflicts hides which rows went in; our own qr_tokens tell us
+        created = set(
+            EventRegistration.objects.filter(qr_token__in=to_create).values_list(
+                "qr_token", flat=True
+            )
+        )
+        for token, (_, result) in to_create.items():
+            result["result"] = REGISTERED if token in created else ALREADY_REGISTERED
+
+        if created:
+            Event.objects.filter(id=event.id).update(
+                seats_taken=F("seats_taken") + len(created)
+            )
+            record(
+                event.id,
+                timezone.now(),
+                registrations=len(created),
+                paid_registrations=len(created),
+            )
+
+    return results, len(created)
@@ -0,0 +1,108 @@
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+# ----------------------------------
+# Live event updates (pub/sub)
+# ----------------------------------
+# Write paths publish per-event deltas (seats taken, paid tickets, check-ins,
+# revenue) once their transaction commits; the SSE view in events.views
+# fans them out to connected dashboards and event pages.
+#
+# InProcessBroker only reaches subscribers in the same process, which is
+# what a single ASGI worker needs. A multi-process deployment (or deltas
+# published by management commands) needs a shared backend with the same
+# subscribe()/publish() interface, selected with LIVE_BROKER.
+
+# Deltas only hosts may see; everyone else gets seats_taken
+HOST_ONLY_FIELDS = ("paid_registrations", "checkins", "revenue")
+
+
+class _Subscription:
+    def __init__(self, loop, maxsize):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def deliver(self, message):
+        # Runs on the subscriber's loop. A consumer that falls this far
+        # behind gets one "resync" and should reload its snapshot.
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            message = {"type": "resync", "data": {}}
+        self.queue.put_nowait(message)
+
+
+class InProcessBroker:
+    def __init__(self, queue_size=None):
+        self.queue_size = queue_size or settings.LIVE_QUEUE_SIZE
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    @asynccontextmanager
+    async def subscribe(self, event_id):
+        subscription = _Subscription(asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(event_id, set()).add(subscription)
+        try:
+            yield subscription.queue
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(event_id, set())
+                subscribers.discard(subscription)
+                if not subscribers:
+                    self._subscribers.pop(event_id, None)
+
+    def publish(self, event_id, message):
+        """Thread-safe; callable from sync views and worker threads."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(event_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+            except RuntimeError:
+                # The subscriber's loop has shut down
+                pass
+
+    def subscriber_count(self, event_id=None):
+        with self._lock:
+            if event_id is not None:
+                return len(self._subscribers.get(event_id, ()))
+            return sum(len(s) for s in self._subscribers.values())
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.LIVE_BROKER)()
+    return _broker
+
+
+def publish_deltas(event_id, deltas):
+    """Publish a delta for `event_id` once the current transaction commits."""
+    deltas = {field: value for field, value in deltas.items() if value}
+    if deltas:
+        transaction.on_commit(
+            lambda: get_broker().publish(event_id, {"type": "delta", "data": deltas})
+        )
+
+
+def visible_data(message, is_host):
+    if is_host or message["type"] != "delta":
+        return message["data"]
+    return {
+        field: value
+        for field, value in message["data"].items()
+        if field not in HOST_ONLY_FIELDS
+    }
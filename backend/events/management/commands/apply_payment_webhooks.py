@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from events.webhooks import apply_pending_webhooks
+
+
+class Command(BaseCommand):
+    help = "Apply queued Razorpay webhook deliveries in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        applied = apply_pending_webhooks(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Applied {applied} webhook deliveries"))
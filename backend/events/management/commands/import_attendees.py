@@ -0,0 +1,57 @@
+import csv
+import sys
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from events.imports import IMPORT_BATCH_SIZE, import_attendees, parse_csv, parse_ndjson
+from events.models import Event
+
+
+class Command(BaseCommand):
+    help = "Issue comp tickets for an event from a CSV / NDJSON list of usernames or emails"
+
+    def add_arguments(self, parser):
+        parser.add_argument("event_id", type=int)
+        parser.add_argument("path", help='Input file, or "-" for stdin')
+        parser.add_argument(
+            "--format",
+            choices=("csv", "ndjson"),
+            help="Defaults to ndjson for .ndjson / .jsonl files, csv otherwise",
+        )
+        parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+        parser.add_argument("--report", help="Write the per-row results to this CSV file")
+
+    def handle(self, *args, **options):
+        try:
+            event = Event.objects.only("id", "host_id").get(id=options["event_id"])
+        except Event.DoesNotExist:
+            raise CommandError(f"Event {options['event_id']} does not exist")
+
+        path = options["path"]
+        fmt = options["format"] or (
+            "ndjson" if path.lower().endswith((".ndjson", ".jsonl")) else "csv"
+        )
+        parse = parse_ndjson if fmt == "ndjson" else parse_csv
+
+        source = sys.stdin if path == "-" else open(path, encoding="utf-8-sig", newline="")
+        report = open(options["report"], "w", newline="") if options["report"] else None
+        summary = Counter()
+        try:
+            writer = csv.writer(report) if report else None
+            if writer:
+                writer.writerow(["row", "identifier", "result"])
+
+            for result in import_attendees(event, parse(source), options["batch_size"]):
+                summary[result["result"]] += 1
+                if writer:
+                    writer.writerow([result["row"], result["identifier"], result["result"]])
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            if report:
+                report.close()
+
+        self.stdout.write(f"Imported attendees for event {event.id}:")
+        for key, count in sorted(summary.items()):
+            self.stdout.write(f"  {key}: {count}")
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from events.analytics import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the EventDailyStats analytics rollup from registrations and "
+        "payments (backfill, or repair after manual edits)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--event",
+            type=int,
+            action="append",
+            dest="event_ids",
+            help="Only rebuild this event (repeatable); default is every event",
+        )
+
+    def handle(self, *args, **options):
+        rows = rebuild_stats(options["event_ids"])
+        self.stdout.write(f"Wrote {rows} daily stats rows")
@@ -0,0 +1,225 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import reduce
+from itertools import islice
+from operator import or_
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from events.analytics import StatsDelta
+from events.cache import invalidate_event_cache
+from events.holds import rebook_late_payment
+from events.models import EventRegistration, Payment
+from events.payments import PaymentGatewayError, get_gateway
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconcile stuck CREATED payments against the gateway and repair PAID "
+        "payments whose registration was never marked paid"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=500)
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=8,
+            help="Gateway lookups in flight at once",
+        )
+        parser.add_argument(
+            "--min-age",
+            type=int,
+            default=30,
+            help="Only check CREATED payments older than this many minutes",
+        )
+        parser.add_argument(
+            "--abandon-after",
+            type=int,
+            default=24,
+            help="Mark CREATED payments with no attempts FAILED after this many hours",
+        )
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        self.dry_run = options["dry_run"]
+        self.summary = Counter()
+        now = timezone.now()
+
+        stuck = (
+            Payment.objects.filter(
+                status="CREATED",
+                created_at__lt=now - timedelta(minutes=options["min_age"]),
+            )
+            # Everything the bulk_update below writes back, too: a deferred
+            # razorpay_payment_id would be fetched one row at a time
+            .only(
+                "id",
+                "user_id",
+                "event_id",
+                "razorpay_order_id",
+                "razorpay_payment_id",
+                "amount",
+                "created_at",
+            )
+            .order_by("id")
+        )
+        abandon_before = now - timedelta(hours=options["abandon_after"])
+
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            for chunk in _chunks(stuck.iterator(chunk_size=options["chunk_size"]), options["chunk_size"]):
+                self._reconcile_created(chunk, pool, abandon_before)
+
+        registration = EventRegistration.objects.filter(
+            user_id=OuterRef("user_id"), event_id=OuterRef("event_id")
+        )
+        # PAID with the registration left unpaid, or with the hold reaped
+        # before the capture landed
+        inconsistent = (
+            Payment.objects.filter(status="PAID")
+            .filter(Exists(registration.filter(is_paid=False)) | ~Exists(registration))
+            .only("id", "user_id", "event_id", "amount", "created_at")
+            .order_by("id")
+        )
+        for chunk in _chunks(inconsistent.iterator(chunk_size=options["chunk_size"]), options["chunk_size"]):
+            self.summary["paid_inconsistent"] += len(chunk)
+            refund_due = self._mark_registrations_paid(chunk)
+            # Their revenue was booked when they were marked PAID
+            stats = StatsDelta()
+            for payment in refund_due:
+                stats.add(payment.event_id, payment.created_at, revenue=-payment.amount)
+            stats.apply()
+
+        if self.summary["registrations_fixed"] and not self.dry_run:
+            invalidate_event_cache()
+        self._report()
+
+    def _reconcile_created(self, chunk, pool, abandon_before):
+        self.summary["created_checked"] += len(chunk)
+
+        def lookup(payment):
+            try:
+                return payment, get_gateway().fetch_order_payments(payment.razorpay_order_id)
+            except PaymentGatewayError:
+                return payment, None
+
+        changed = []
+        for payment, attempts in pool.map(lookup, chunk):
+            if attempts is None:
+                self.summary["gateway_errors"] += 1
+                continue
+
+            captured = [a for a in attempts if a.get("status") == "captured"]
+            if captured:
+                payment.status = "PAID"
+                payment.razorpay_payment_id = captured[0]["id"]
+                self.summary["marked_paid"] += 1
+            elif attempts and all(a.get("status") == "failed" for a in attempts):
+                payment.status = "FAILED"
+                self.summary["marked_failed"] += 1
+            elif not attempts and payment.created_at < abandon_before:
+                payment.status = "FAILED"
+                self.summary["marked_abandoned"] += 1
+            else:
+                self.summary["unchanged"] += 1
+                continue
+            changed.append(payment)
+
+        if changed and not self.dry_run:
+            with transaction.atomic():
+                # Skip anything the webhook or verify_payment settled meanwhile
+                still_created = set(
+                    Payment.objects.select_for_update()
+                    .filter(id__in=[p.id for p in changed], status="CREATED")
+                    .values_list("id", flat=True)
+                )
+                changed = [p for p in changed if p.id in still_created]
+                Payment.objects.bulk_update(changed, ["status", "razorpay_payment_id"])
+
+                # Late captures may end up REFUND_DUE; only the rest is revenue
+                self._mark_registrations_paid([p for p in changed if p.status == "PAID"])
+
+                stats = StatsDelta()
+                for payment in changed:
+                    if payment.status == "PAID":
+                        stats.add(payment.event_id, payment.created_at, revenue=payment.amount)
+                stats.apply()
+        else:
+            self._mark_registrations_paid([p for p in changed if p.status == "PAID"])
+
+    def _mark_registrations_paid(self, payments):
+        """Mark the payers' registrations paid; returns payments now REFUND_DUE."""
+        if not payments:
+            return []
+
+        registrations = EventRegistration.objects.filter(
+            reduce(or_, (Q(user_id=p.user_id, event_id=p.event_id) for p in payments))
+        )
+        if self.dry_run:
+            registered = set(registrations.values_list("user_id", "event_id"))
+            self.summary["registrations_fixed"] += registrations.filter(is_paid=False).count()
+            self.summary["holds_reaped"] += sum(
+                (p.user_id, p.event_id) not in registered for p in payments
+            )
+            return []
+
+        refund_due = []
+        with transaction.atomic():
+            rows = list(
+                registrations.select_for_update().values_list(
+                    "id", "user_id", "event_id", "registered_at", "is_paid"
+                )
+            )
+            unpaid = [row for row in rows if not row[4]]
+            EventRegistration.objects.filter(id__in=[row[0] for row in unpaid]).update(
+                is_paid=True,
+                is_approved=True,
+                hold_expires_at=None,
+                updated_at=timezone.now(),
+            )
+
+            stats = StatsDelta()
+            for _, _, event_id, registered_at, _ in unpaid:
+                stats.add(event_id, registered_at, paid_registrations=1)
+            stats.apply()
+
+            registered = {(user_id, event_id) for _, user_id, event_id, _, _ in rows}
+            for payment in payments:
+                if (payment.user_id, payment.event_id) in registered:
+                    continue
+                self.summary["holds_reaped"] += 1
+                if rebook_late_payment(payment):
+                    registered.add((payment.user_id, payment.event_id))
+                    self.summary["registrations_fixed"] += 1
+                else:
+                    refund_due.append(payment)
+                    self.summary["refund_due"] += 1
+        self.summary["registrations_fixed"] += len(unpaid)
+        return refund_due
+
+    def _report(self):
+        prefix = "[dry run] " if self.dry_run else ""
+        self.stdout.write(f"{prefix}Payment reconciliation summary:")
+        for key in (
+            "created_checked",
+            "marked_paid",
+            "marked_failed",
+            "marked_abandoned",
+            "unchanged",
+            "gateway_errors",
+            "paid_inconsistent",
+            "holds_reaped",
+            "registrations_fixed",
+            "refund_due",
+        ):
+            self.stdout.write(f"  {key}: {self.summary[key]}")
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from events.holds import release_expired_holds
+
+
+class Command(BaseCommand):
+    help = "Release seats held by unpaid registrations whose hold has expired"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running, sweeping every --interval seconds",
+        )
+        parser.add_argument("--interval", type=int, default=60)
+
+    def handle(self, *args, **options):
+        while True:
+            released = release_expired_holds(batch_size=options["batch_size"])
+            self.stdout.write(f"Released {released} expired seat holds")
+
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,71 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from events.tasks import claim_tasks, purge_tasks, run_task
+
+
+class Command(BaseCommand):
+    help = "Run background tasks from the database queue"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait before polling an empty queue again",
+        )
+        parser.add_argument(
+            "--visibility-timeout",
+            type=int,
+            default=None,
+            help="Seconds a claimed task stays leased (default: TASK_VISIBILITY_TIMEOUT)",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once the queue is drained",
+        )
+        parser.add_argument(
+            "--purge-after",
+            type=int,
+            default=7,
+            help="Delete finished tasks older than this many days on startup",
+        )
+
+    def handle(self, *args, **options):
+        workers = options["workers"]
+        poll_interval = options["poll_interval"]
+
+        purged = purge_tasks(timezone.now() - timedelta(days=options["purge_after"]))
+        if purged:
+            self.stdout.write(f"Purged {purged} finished tasks")
+
+        processed = 0
+        in_flight = set()
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="task") as pool:
+            try:
+                while True:
+                    free = workers - len(in_flight)
+                    if free:
+                        for task in claim_tasks(free, options["visibility_timeout"]):
+                            in_flight.add(pool.submit(run_task, task))
+
+                    if not in_flight:
+                        if options["once"]:
+                            break
+                        time.sleep(poll_interval)
+                        continue
+
+                    done, in_flight = wait(
+                        in_flight, timeout=poll_interval, return_when=FIRST_COMPLETED
+                    )
+                    processed += len(done)
+            except KeyboardInterrupt:
+                self.stdout.write("Stopping; waiting for running tasks to finish")
+
+        self.stdout.write(f"Processed {processed} tasks")
@@ -0,0 +1,33 @@
+from django.core.cache import cache
+
+
+# ----------------------------------
+# Lightweight counters
+# ----------------------------------
+# Stored in the default cache so they are shared between workers whenever a
+# shared cache backend is configured.
+
+PREFIX = "events:metrics:"
+
+PAYMENT_GATEWAY_CALLS = "payments.gateway_calls"
+PAYMENT_GATEWAY_CALLS_AVOIDED = "payments.gateway_calls_avoided"
+
+COUNTERS = (
+    PAYMENT_GATEWAY_CALLS,
+    PAYMENT_GATEWAY_CALLS_AVOIDED,
+)
+
+
+def incr(name, delta=1):
+    key = PREFIX + name
+    if not cache.add(key, delta, None):
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            # Evicted between add() and incr()
+            cache.set(key, delta, None)
+
+
+def snapshot():
+    values = cache.get_many([PREFIX + name for name in COUNTERS])
+    return {name: values.get(PREFIX + name, 0) for name in COUNTERS}
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.9 on 2026-10-18 20:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def expire_legacy_holds(apps, schema_editor):
+    # Unpaid registrations made before holds existed get the default window
+    # from when they registered, so abandoned ones become reapable.
+    EventRegistration = apps.get_model("events", "EventRegistration")
+    EventRegistration.objects.filter(is_paid=False).update(
+        hold_expires_at=models.F("registered_at") + settings.SEAT_HOLD_TTL
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0007_payment_idempotency'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventregistration',
+            name='hold_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(expire_legacy_holds, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='eventregistration',
+            index=models.Index(condition=models.Q(('is_paid', False)), fields=['hold_expires_at'], name='reg_unpaid_hold_idx'),
+        ),
+    ]
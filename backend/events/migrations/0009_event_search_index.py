@@ -0,0 +1,87 @@
+# Generated by Django 5.2.9 on 2026-10-18 21:05
+
+from django.db import migrations
+
+
+# Keep in step with events.search.SEARCH_FIELDS / PG_DOCUMENT
+SEARCH_FIELDS = ("title", "description", "place_name", "location")
+
+PG_INDEX = "event_search_gin_idx"
+PG_DOCUMENT = (
+    "to_tsvector('english', "
+    + " || ' ' || ".join(f"coalesce({f}, '')" for f in SEARCH_FIELDS)
+    + ")"
+)
+
+FTS_COLUMNS = ", ".join(SEARCH_FIELDS)
+FTS_NEW = ", ".join(f"new.{f}" for f in SEARCH_FIELDS)
+FTS_OLD = ", ".join(f"old.{f}" for f in SEARCH_FIELDS)
+
+SQLITE_FORWARD = [
+    f"""
+    CREATE VIRTUAL TABLE events_event_fts USING fts5(
+        {FTS_COLUMNS}, content='events_event', content_rowid='id'
+    )
+    """,
+    f"""
+    CREATE TRIGGER events_event_fts_ai AFTER INSERT ON events_event BEGIN
+        INSERT INTO events_event_fts(rowid, {FTS_COLUMNS})
+        VALUES (new.id, {FTS_NEW});
+    END
+    """,
+    f"""
+    CREATE TRIGGER events_event_fts_ad AFTER DELETE ON events_event BEGIN
+        INSERT INTO events_event_fts(events_event_fts, rowid, {FTS_COLUMNS})
+        VALUES ('delete', old.id, {FTS_OLD});
+    END
+    """,
+    f"""
+    CREATE TRIGGER events_event_fts_au AFTER UPDATE OF {FTS_COLUMNS} ON events_event BEGIN
+        INSERT INTO events_event_fts(events_event_fts, rowid, {FTS_COLUMNS})
+        VALUES ('delete', old.id, {FTS_OLD});
+        INSERT INTO events_event_fts(rowid, {FTS_COLUMNS})
+        VALUES (new.id, {FTS_NEW});
+    END
+    """,
+    "INSERT INTO events_event_fts(events_event_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS events_event_fts_au",
+    "DROP TRIGGER IF EXISTS events_event_fts_ad",
+    "DROP TRIGGER IF EXISTS events_event_fts_ai",
+    "DROP TABLE IF EXISTS events_event_fts",
+]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        # The expression must match PG_DOCUMENT exactly for the planner to use it
+        schema_editor.execute(
+            f"CREATE INDEX {PG_INDEX} ON events_event USING GIN "
+            f"({PG_DOCUMENT})"
+        )
+    elif vendor == "sqlite":
+        for statement in SQLITE_FORWARD:
+            schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(f"DROP INDEX IF EXISTS {PG_INDEX}")
+    elif vendor == "sqlite":
+        for statement in SQLITE_BACKWARD:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0008_registration_seat_holds'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.9 on 2026-10-18 20:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0013_task_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('registrations', models.IntegerField(default=0)),
+                ('paid_registrations', models.IntegerField(default=0)),
+                ('checkins', models.IntegerField(default=0)),
+                ('revenue', models.BigIntegerField(default=0)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='events.event')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('event', 'day'), name='event_daily_stats_uniq')],
+            },
+        ),
+    ]
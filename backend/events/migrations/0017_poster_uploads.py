@@ -0,0 +1,27 @@
+# Generated by Django 5.2.9 on 2026-10-18 21:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0016_payment_refund_due'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='event',
+            name='poster_spool_path',
+        ),
+        migrations.CreateModel(
+            name='PosterUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='poster_uploads', to='events.event')),
+            ],
+        ),
+    ]
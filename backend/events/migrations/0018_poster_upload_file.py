@@ -0,0 +1,37 @@
+# Generated by Django 5.2.9 on 2026-10-18 22:10
+
+import events.models
+from django.core.files.base import ContentFile
+from django.db import migrations, models
+
+
+def move_blobs_to_storage(apps, schema_editor):
+    # Uploads still waiting for the worker keep their poster
+    PosterUpload = apps.get_model("events", "PosterUpload")
+    for poster in PosterUpload.objects.exclude(data=b"").iterator():
+        poster.file.save(
+            f"{poster.event_id}.upload",
+            ContentFile(bytes(poster.data)),
+            save=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0017_poster_uploads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='posterupload',
+            name='file',
+            field=models.FileField(default='', storage=events.models.poster_upload_storage, upload_to='poster_uploads/'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(move_blobs_to_storage, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='posterupload',
+            name='data',
+        ),
+    ]
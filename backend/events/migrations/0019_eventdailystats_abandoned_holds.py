@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-18 22:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0018_poster_upload_file'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventdailystats',
+            name='abandoned_holds',
+            field=models.IntegerField(default=0),
+        ),
+    ]
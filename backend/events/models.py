@@ -1,8 +1,38 @@
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.core.files.storage import storages
 from django.db import models
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
+from django.utils import timezone
 from cloudinary.models import CloudinaryField
+from contextvars import ContextVar
 import uuid
 
+from .geo import GEOHASH_LENGTH, encode as geohash_encode
+from .images import build_variants
+
+
+# Set while a bulk path (the hold reaper) deletes registrations and gives
+# their seats back itself; see events.signals.release_registration_seat.
+releasing_seats_in_bulk = ContextVar("releasing_seats_in_bulk", default=False)
+
+
+class EventQuerySet(models.QuerySet):
+    def with_attendees_count(self):
+        # A correlated subquery rather than JOIN + GROUP BY: it only runs for
+        # the rows a page actually returns, so deep cursor pages stay cheap.
+        approved = (
+            EventRegistration.objects.filter(event=OuterRef("pk"), is_approved=True)
+            .order_by()
+            .values("event")
+            .annotate(count=Count("id"))
+            .values("count")
+        )
+        return self.annotate(
+            attendees_count=Coalesce(Subquery(approved), 0)
+        )
+
 
 class Event(models.Model):
     CATEGORY_CHOICES = [
@@ -10,6 +40,13 @@ class Event(models.Model):
         ("paid", "Paid"),
     ]
 
+    IMAGE_STATUS_CHOICES = [
+        ("none", "None"),
+        ("pending", "Pending"),
+        ("ready", "Ready"),
+        ("failed", "Failed"),
+    ]
+
     host = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="hosted_events"
     )
@@ -19,22 +56,98 @@ class Event(models.Model):
 
     # ✅ Cloudinary poster
     image = CloudinaryField("event_images", blank=True, null=True)
+    # thumb / card / full URLs, precomputed whenever the poster changes
+    image_variants = models.JSONField(default=dict, blank=True)
+    # Uploads are processed off the request path (see events.posters)
+    image_status = models.CharField(
+        max_length=10, choices=IMAGE_STATUS_CHOICES, default="none"
+    )
 
     category = models.CharField(max_length=10, choices=CATEGORY_CHOICES)
 
     place_name = models.CharField(max_length=200)
     location = models.CharField(max_length=300)
+    latitude = models.FloatField(
+        null=True, blank=True,
+        validators=[MinValueValidator(-90), MaxValueValidator(90)],
+    )
+    longitude = models.FloatField(
+        null=True, blank=True,
+        validators=[MinValueValidator(-180), MaxValueValidator(180)],
+    )
+    # Derived from latitude/longitude in save(); prefix-searched by "nearby"
+    geohash = models.CharField(max_length=GEOHASH_LENGTH, blank=True, db_index=True)
     date = models.DateTimeField()
     
     capacity = models.PositiveIntegerField(default=50)
+    # Denormalized count of registrations, kept in step by claim_seat/release_seat
+    seats_taken = models.PositiveIntegerField(default=0)
     price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     upi_id = models.CharField(max_length=100, null=True, blank=True)
     approved = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = EventQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Public listing: approved upcoming events in (date, id) cursor
+            # order. Partial rather than (approved, date): Django emits
+            # WHERE "approved" for approved=True, which SQLite can't use as an
+            # equality on a leading index column.
+            models.Index(
+                fields=["date", "id"],
+                condition=Q(approved=True),
+                name="event_public_date_idx",
+            ),
+            # Admin queue: the (small) unapproved backlog by age
+            models.Index(
+                fields=["created_at"],
+                condition=Q(approved=False),
+                name="event_pending_created_idx",
+            ),
+            # Host dashboard: a host's events, newest first
+            models.Index(fields=["host", "-date"], name="event_host_date_idx"),
+        ]
+
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = geohash_encode(self.latitude, self.longitude)
+        else:
+            self.geohash = ""
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and (
+            {"latitude", "longitude"} & set(update_fields)
+        ):
+            kwargs["update_fields"] = {*update_fields, "geohash"}
+        super().save(*args, **kwargs)
+
+        # The upload itself happens in CloudinaryField.pre_save, so variants
+        # can only be derived once the row has been written.
+        image = self.image
+        if isinstance(image, str):
+            image = self._meta.get_field("image").to_python(image)
+        variants = build_variants(image)
+        if variants != self.image_variants:
+            self.image_variants = variants
+            Event.objects.filter(pk=self.pk).update(image_variants=variants)
+
+    def claim_seat(self):
+        """Take one seat with a single conditional UPDATE; False when full."""
+        return bool(
+            Event.objects.filter(id=self.id, seats_taken__lt=F("capacity"))
+            .update(seats_taken=F("seats_taken") + 1)
+        )
+
+    def release_seat(self):
+        Event.objects.filter(id=self.id, seats_taken__gt=0).update(
+            seats_taken=F("seats_taken") - 1
+        )
+
 
 class EventRegistration(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -42,6 +155,8 @@ class EventRegistration(models.Model):
 
     is_paid = models.BooleanField(default=False)
     is_approved = models.BooleanField(default=False)
+    # Unpaid registrations only hold their seat until this time
+    hold_expires_at = models.DateTimeField(null=True, blank=True)
 
     # ✅ Token only (React renders QR)
     qr_token = models.UUIDField(default=uuid.uuid4, unique=True)
@@ -50,25 +165,60 @@ class EventRegistration(models.Model):
     scanned_at = models.DateTimeField(null=True, blank=True)
 
     registered_at = models.DateTimeField(auto_now_add=True)
+    # Bumped on every change (set it explicitly in queryset .update() calls);
+    # drives the scanner roster delta sync.
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ("user", "event")
+        indexes = [
+            models.Index(fields=["event", "updated_at"], name="reg_event_updated_idx"),
+            models.Index(fields=["event", "is_approved"], name="reg_event_approved_idx"),
+            models.Index(fields=["event", "is_scanned"], name="reg_event_scanned_idx"),
+            models.Index(
+                fields=["hold_expires_at"],
+                condition=Q(is_paid=False),
+                name="reg_unpaid_hold_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.username} → {self.event.title}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets post_save tell whether is_approved changed (see events.signals)
+        instance._loaded_is_approved = dict(zip(field_names, values)).get("is_approved")
+        return instance
+
+    @property
+    def hold_expired(self):
+        return (
+            not self.is_paid
+            and self.hold_expires_at is not None
+            and self.hold_expires_at <= timezone.now()
+        )
+
 
 class Payment(models.Model):
     STATUS_CHOICES = (
         ("CREATED", "Created"),
         ("PAID", "Paid"),
         ("FAILED", "Failed"),
+        # Captured after the seat hold was reaped, with no seat left to give
+        ("REFUND_DUE", "Refund due"),
     )
 
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     event = models.ForeignKey(Event, on_delete=models.CASCADE)
+    registration = models.ForeignKey(
+        EventRegistration, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    # Client-supplied Idempotency-Key header, unique per user
+    idempotency_key = models.CharField(max_length=100, null=True, blank=True)
 
-    razorpay_order_id = models.CharField(max_length=200)
+    razorpay_order_id = models.CharField(max_length=200, unique=True)
     razorpay_payment_id = models.CharField(max_length=200, blank=True, null=True)
     razorpay_signature = models.CharField(max_length=200, blank=True, null=True)
 
@@ -77,5 +227,128 @@ class Payment(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "idempotency_key"],
+                condition=Q(idempotency_key__isnull=False),
+                name="payment_idempotency_key_uniq",
+            ),
+        ]
+
     def __str__(self):
         return f"{self.user.username} → {self.event.title} ({self.status})"
+
+
+class PaymentWebhookEvent(models.Model):
+    """Inbox of Razorpay webhook deliveries; event_id makes redelivery a no-op."""
+
+    event_id = models.CharField(max_length=100, unique=True)
+    event_type = models.CharField(max_length=50)
+    payload = models.JSONField()
+
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["received_at"],
+                condition=Q(processed_at__isnull=True),
+                name="webhook_pending_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} ({self.event_id})"
+
+
+class Task(models.Model):
+    """A job for the built-in queue; see events.tasks and `run_workers`."""
+
+    STATUS_CHOICES = (
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    )
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="queued")
+
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    # Not claimable before this (set for retries with backoff)
+    run_after = models.DateTimeField(default=timezone.now)
+    # A running task whose worker dies is reclaimed once this passes
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["run_after"],
+                condition=Q(status="queued"),
+                name="task_queued_idx",
+            ),
+            models.Index(
+                fields=["locked_until"],
+                condition=Q(status="running"),
+                name="task_running_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.id} ({self.status})"
+
+
+def poster_upload_storage():
+    return storages["poster_uploads"]
+
+
+class PosterUpload(models.Model):
+    """
+    A raw poster waiting for `run_workers` (see events.posters). The file is
+    kept on the shared "poster_uploads" storage rather than local disk so any
+    worker process can read it.
+    """
+
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name="poster_uploads")
+    file = models.FileField(upload_to="poster_uploads/", storage=poster_upload_storage)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Poster for {self.event_id} #{self.id}"
+
+
+class EventDailyStats(models.Model):
+    """
+    Per-event, per-day rollup for host analytics (see events.analytics).
+
+    Registrations, paid tickets and abandoned holds are bucketed by the day
+    the registration was made, check-ins by scan day and revenue by the
+    payment's day.
+    """
+
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name="daily_stats")
+    day = models.DateField()
+
+    registrations = models.IntegerField(default=0)
+    paid_registrations = models.IntegerField(default=0)
+    checkins = models.IntegerField(default=0)
+    revenue = models.BigIntegerField(default=0)  # paise
+    # Joins whose unpaid hold the reaper freed; still counted in registrations
+    abandoned_holds = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["event", "day"], name="event_daily_stats_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.event_id} @ {self.day}"
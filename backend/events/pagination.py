@@ -0,0 +1,137 @@
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, PageNumberPagination
+
+
+# ----------------------------------
+# HOSTED EVENTS
+# ----------------------------------
+class HostedEventsPagination(PageNumberPagination):
+    # Off unless the client asks for ?page_size=, so existing callers
+    # still get a plain list.
+    page_size = None
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+# ----------------------------------
+# EVENT ATTENDEES (HOST)
+# ----------------------------------
+class AttendeeCursorPagination(CursorPagination):
+    # Keyset on the primary key: every page is an index range scan,
+    # no matter how deep the door team has paged.
+    ordering = "id"
+    page_size = None
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+
+# ----------------------------------
+# EVENT LISTINGS
+# ----------------------------------
+class KeysetCursorPagination(CursorPagination):
+    """
+    Cursor pagination on the full ordering key, e.g. (date, id).
+
+    DRF's CursorPagination positions on the first ordering field only and
+    steps over rows sharing that value with an OFFSET. Here the cursor holds
+    every key value of the last row, so each page is one
+    WHERE (date, id) > (...) ORDER BY date, id LIMIT n range scan, however
+    deep the client has paged and however many rows share a date.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+
+        if reverse:
+            queryset = queryset.order_by(*(_flip(key) for key in self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if self.cursor is not None and self.cursor.position is not None:
+            values = self._decode_position(queryset.model, self.cursor.position)
+            queryset = queryset.filter(self._after(values, reverse))
+
+        results = list(queryset[: self.page_size + 1])
+        self.page = results[: self.page_size]
+        has_more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+
+        positioned = self.cursor is not None and self.cursor.position is not None
+        self.has_next = positioned if reverse else has_more
+        self.has_previous = has_more if reverse else positioned
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        row = self.page[-1] if self.page else None
+        return self._link(row, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        row = self.page[0] if self.page else None
+        return self._link(row, reverse=True)
+
+    def _link(self, row, reverse):
+        position = self.cursor.position if row is None else "|".join(
+            str(getattr(row, key.lstrip("-"))) for key in self.ordering
+        )
+        return self.encode_cursor(Cursor(offset=0, reverse=reverse, position=position))
+
+    def _decode_position(self, model, position):
+        values = position.split("|")
+        if len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            return [
+                model._meta.get_field(key.lstrip("-")).to_python(value)
+                for key, value in zip(self.ordering, values)
+            ]
+        except ValidationError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def _after(self, values, reverse):
+        # (a, b) > (x, y)  ==  a > x OR (a = x AND b > y); the leading
+        # a >= x bound lets the planner start the index scan there.
+        fields = [key.lstrip("-") for key in self.ordering]
+        lookups = [
+            "lt" if key.startswith("-") != reverse else "gt" for key in self.ordering
+        ]
+
+        branches = []
+        for i, field in enumerate(fields):
+            equal = dict(zip(fields[:i], values[:i]))
+            branches.append(Q(**equal, **{f"{field}__{lookups[i]}": values[i]}))
+        return Q(**{f"{fields[0]}__{lookups[0]}e": values[0]}) & reduce(or_, branches)
+
+
+def _flip(key):
+    return key[1:] if key.startswith("-") else f"-{key}"
+
+
+class EventCursorPagination(KeysetCursorPagination):
+    ordering = ("date", "id")
+    page_size = None
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class PendingEventCursorPagination(KeysetCursorPagination):
+    ordering = ("created_at", "id")
+    page_size = None
+    page_size_query_param = "page_size"
+    max_page_size = 100
@@ -0,0 +1,167 @@
+import hashlib
+import hmac
+import threading
+import uuid
+
+import razorpay
+import requests
+from django.conf import settings
+from django.utils.module_loading import import_string
+from razorpay.errors import BadRequestError, GatewayError, ServerError
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+# ----------------------------------
+# Payment gateway abstraction
+# ----------------------------------
+# Views talk to `get_gateway()` instead of a Razorpay client directly, so the
+# HTTP behaviour (pooling, timeouts, retries) lives in one place and load
+# tests can swap in FakeGateway via settings.PAYMENT_GATEWAY.
+
+
+class PaymentGatewayError(Exception):
+    """The gateway could not be reached or rejected the request."""
+
+
+class BaseGateway:
+    def __init__(self, key_id, key_secret):
+        self.key_id = key_id
+        self.key_secret = key_secret
+
+    def sign(self, message, secret=None):
+        if isinstance(message, str):
+            message = message.encode()
+        return hmac.new(
+            (secret or self.key_secret).encode(), message, hashlib.sha256
+        ).hexdigest()
+
+    def verify_payment_signature(self, order_id, payment_id, signature):
+        expected = self.sign(f"{order_id}|{payment_id}")
+        return hmac.compare_digest(expected, str(signature))
+
+    def verify_webhook_signature(self, body, signature, secret):
+        return hmac.compare_digest(self.sign(body, secret), str(signature))
+
+    def create_order(self, amount, currency="INR"):
+        raise NotImplementedError
+
+    def fetch_order_payments(self, order_id):
+        """Payment attempts on an order, as dicts with at least id and status."""
+        raise NotImplementedError
+
+
+class _TimeoutSession(requests.Session):
+    def __init__(self, timeout):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, *args, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(*args, **kwargs)
+
+
+class RazorpayGateway(BaseGateway):
+    """
+    Razorpay over a pooled keep-alive session.
+
+    Every call is bounded by (connect, read) timeouts. Retries are limited
+    to failed connects and to idempotent reads, so an order is never
+    created twice by a retry.
+    """
+
+    def __init__(self, key_id, key_secret, timeout=(3.05, 10), pool_size=20, retries=2):
+        super().__init__(key_id, key_secret)
+
+        session = _TimeoutSession(timeout)
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=Retry(
+                total=retries,
+                connect=retries,
+                read=retries,
+                status=retries,
+                allowed_methods=frozenset(["GET"]),
+                status_forcelist=(502, 503, 504),
+                backoff_factor=0.2,
+                raise_on_status=False,
+            ),
+        )
+        session.mount("https://", adapter)
+
+        self.client = razorpay.Client(session=session, auth=(key_id, key_secret))
+
+    def create_order(self, amount, currency="INR"):
+        try:
+            return self.client.order.create({
+                "amount": amount,
+                "currency": currency,
+                "payment_capture": 1
+            })
+        except (requests.RequestException, BadRequestError, GatewayError, ServerError) as exc:
+            raise PaymentGatewayError(str(exc)) from exc
+
+    def fetch_order_payments(self, order_id):
+        try:
+            return self.client.order.payments(order_id).get("items", [])
+        except (requests.RequestException, BadRequestError, GatewayError, ServerError) as exc:
+            raise PaymentGatewayError(str(exc)) from exc
+
+
+class FakeGateway(BaseGateway):
+    """In-process stand-in for load tests and local development; no network."""
+
+    def __init__(self, key_id="", key_secret="", **options):
+        super().__init__(key_id or "rzp_test_fake", key_secret or "fake_secret")
+        self._lock = threading.Lock()
+        self.orders = {}
+        self.payments = {}
+
+    def create_order(self, amount, currency="INR"):
+        with self._lock:
+            order_id = f"order_{uuid.uuid4().hex[:14]}"
+            order = {
+                "id": order_id,
+                "entity": "order",
+                "amount": amount,
+                "currency": currency,
+                "status": "created",
+            }
+            self.orders[order_id] = order
+        return order
+
+    def fetch_order_payments(self, order_id):
+        with self._lock:
+            return list(self.payments.get(order_id, []))
+
+    def record_payment(self, order_id, status="captured"):
+        """Simulate a payment attempt on an order (tests / load scripts)."""
+        with self._lock:
+            payment = {"id": f"pay_{uuid.uuid4().hex[:14]}", "status": status}
+            self.payments.setdefault(order_id, []).append(payment)
+        return payment
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    global _gateway
+
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                gateway_class = import_string(settings.PAYMENT_GATEWAY)
+                _gateway = gateway_class(
+                    settings.RAZORPAY_KEY_ID,
+                    settings.RAZORPAY_KEY_SECRET,
+                    timeout=(
+                        settings.PAYMENT_GATEWAY_CONNECT_TIMEOUT,
+                        settings.PAYMENT_GATEWAY_READ_TIMEOUT,
+                    ),
+                    pool_size=settings.PAYMENT_GATEWAY_POOL_SIZE,
+                    retries=settings.PAYMENT_GATEWAY_RETRIES,
+                )
+    return _gateway
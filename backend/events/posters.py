@@ -0,0 +1,112 @@
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+
+from cloudinary import uploader
+from django.conf import settings
+from django.utils.module_loading import import_string
+from PIL import Image
+
+from .models import Event, PosterUpload
+from .tasks import enqueue, is_last_attempt
+
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------------
+# Poster upload pipeline
+# ----------------------------------
+# Event creation streams the raw upload to the shared "poster_uploads"
+# storage as a PosterUpload, marks the event's image_status "pending" and
+# enqueues a task. A `run_workers` process (the Procfile's worker, which
+# shares no disk with the web process) then resizes the poster, hands it to
+# the configured storage and fills in Event.image.
+
+
+class CloudinaryPosterStorage:
+    def save(self, path):
+        """Upload the file at `path`; returns a value for Event.image."""
+        return uploader.upload_resource(path, folder="event_images")
+
+
+class LocalPosterStorage:
+    """Stand-in for tests and offline development: copies into MEDIA_ROOT."""
+
+    def save(self, path):
+        name = f"{uuid.uuid4().hex}.jpg"
+        target_dir = os.path.join(settings.MEDIA_ROOT, "event_images")
+        os.makedirs(target_dir, exist_ok=True)
+        shutil.copyfile(path, os.path.join(target_dir, name))
+        return f"image/upload/event_images/{name}"
+
+
+def get_poster_storage():
+    return import_string(settings.POSTER_STORAGE)()
+
+
+def queue_poster(event, upload):
+    # Written in chunks from the request's temp file; size is checked by
+    # EventSerializer.validate_image against POSTER_MAX_BYTES
+    poster = PosterUpload(event=event)
+    poster.file.save(upload.name, upload, save=True)
+    event.image_status = "pending"
+    event.save(update_fields=["image_status"])
+
+    enqueue("events.posters.process_poster", upload_id=poster.id)
+
+
+def process_poster(upload_id):
+    poster = PosterUpload.objects.select_related("event").filter(id=upload_id).first()
+    if poster is None:
+        return
+    event = poster.event
+
+    # A newer upload for the same event supersedes this one
+    if PosterUpload.objects.filter(event=event, id__gt=poster.id).exists():
+        poster.delete()
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        original = os.path.join(workdir, "original")
+        resized = os.path.join(workdir, "poster.jpg")
+
+        try:
+            with poster.file.open("rb") as src, open(original, "wb") as dst:
+                for chunk in src.chunks():
+                    dst.write(chunk)
+        except Exception:
+            # Same as a failed save below: the queue retries with backoff
+            if is_last_attempt():
+                _poster_failed(poster)
+            raise
+
+        try:
+            with Image.open(original) as img:
+                img.thumbnail((settings.POSTER_MAX_DIMENSION, settings.POSTER_MAX_DIMENSION))
+                img.convert("RGB").save(resized, "JPEG", quality=85, optimize=True)
+        except (OSError, Image.DecompressionBombError):
+            # Not an image we can read; retrying won't change that
+            logger.warning("Unreadable poster for event %s", event.id, exc_info=True)
+            _poster_failed(poster)
+            return
+
+        try:
+            event.image = get_poster_storage().save(resized)
+        except Exception:
+            # Storage errors are usually transient: let the task queue retry
+            # with backoff, keeping the upload until the last attempt
+            if is_last_attempt():
+                _poster_failed(poster)
+            raise
+
+    event.image_status = "ready"
+    event.save(update_fields=["image", "image_status"])
+    poster.delete()
+
+
+def _poster_failed(poster):
+    Event.objects.filter(id=poster.event_id).update(image_status="failed")
+    poster.delete()
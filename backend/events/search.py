@@ -0,0 +1,165 @@
+import re
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models import BooleanField, Count, Q
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+
+# ----------------------------------
+# Full-text event search
+# ----------------------------------
+# PostgreSQL: a GIN index on the expression in PG_DOCUMENT (created by
+# migration 0009, which keeps its own copy); queries must repeat that exact
+# expression for the planner to use it.
+# SQLite: an external-content FTS5 table, events_event_fts, kept in sync with
+# events_event by triggers. SQLite migrations that alter events_event rebuild
+# the table and drop its triggers, so ensure_sqlite_fts_triggers() puts them
+# back (and reindexes) after every migrate. Other backends fall back to
+# icontains.
+
+SEARCH_FIELDS = ("title", "description", "place_name", "location")
+
+PG_DOCUMENT = (
+    "to_tsvector('english', "
+    + " || ' ' || ".join(f"coalesce(events_event.{f}, '')" for f in SEARCH_FIELDS)
+    + ")"
+)
+
+FTS_COLUMNS = ", ".join(SEARCH_FIELDS)
+FTS_NEW = ", ".join(f"new.{f}" for f in SEARCH_FIELDS)
+FTS_OLD = ", ".join(f"old.{f}" for f in SEARCH_FIELDS)
+
+SQLITE_FTS_TRIGGERS = {
+    "events_event_fts_ai": f"""
+    CREATE TRIGGER IF NOT EXISTS events_event_fts_ai AFTER INSERT ON events_event BEGIN
+        INSERT INTO events_event_fts(rowid, {FTS_COLUMNS})
+        VALUES (new.id, {FTS_NEW});
+    END
+    """,
+    "events_event_fts_ad": f"""
+    CREATE TRIGGER IF NOT EXISTS events_event_fts_ad AFTER DELETE ON events_event BEGIN
+        INSERT INTO events_event_fts(events_event_fts, rowid, {FTS_COLUMNS})
+        VALUES ('delete', old.id, {FTS_OLD});
+    END
+    """,
+    "events_event_fts_au": f"""
+    CREATE TRIGGER IF NOT EXISTS events_event_fts_au AFTER UPDATE OF {FTS_COLUMNS} ON events_event BEGIN
+        INSERT INTO events_event_fts(events_event_fts, rowid, {FTS_COLUMNS})
+        VALUES ('delete', old.id, {FTS_OLD});
+        INSERT INTO events_event_fts(rowid, {FTS_COLUMNS})
+        VALUES (new.id, {FTS_NEW});
+    END
+    """,
+}
+
+PRICE_BUCKETS = (
+    ("under_500", Decimal("0.01"), Decimal("500")),
+    ("500_1000", Decimal("500"), Decimal("1000")),
+    ("1000_2500", Decimal("1000"), Decimal("2500")),
+    ("2500_plus", Decimal("2500"), None),
+)
+
+
+def ensure_sqlite_fts_triggers(connection):
+    """Recreate missing FTS triggers and reindex; returns True if any were missing."""
+    if connection.vendor != "sqlite":
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name, type FROM sqlite_master WHERE name LIKE %s",
+            ["events_event_fts%"],
+        )
+        existing = dict(cursor.fetchall())
+        if existing.get("events_event_fts") != "table":
+            return False  # search migration not applied yet
+
+        missing = [name for name in SQLITE_FTS_TRIGGERS if name not in existing]
+        for name in missing:
+            cursor.execute(SQLITE_FTS_TRIGGERS[name])
+        if missing:
+            cursor.execute(
+                "INSERT INTO events_event_fts(events_event_fts) VALUES ('rebuild')"
+            )
+    return bool(missing)
+
+
+def _fts5_query(query):
+    # Quote every term so user input can't inject FTS5 syntax; prefix match each.
+    terms = re.findall(r"\w+", query)
+    return " ".join('"%s"*' % term for term in terms)
+
+
+def search_events(queryset, query):
+    """Restrict an Event queryset to rows matching the free-text `query`."""
+    vendor = connection.vendor
+
+    if vendor == "postgresql":
+        return queryset.filter(
+            RawSQL(
+                f"{PG_DOCUMENT} @@ plainto_tsquery('english', %s)",
+                [query],
+                output_field=BooleanField(),
+            )
+        )
+
+    if vendor == "sqlite":
+        match = _fts5_query(query)
+        if not match:
+            return queryset.none()
+        return queryset.filter(
+            RawSQL(
+                "events_event.id IN (SELECT rowid FROM events_event_fts "
+                "WHERE events_event_fts MATCH %s)",
+                [match],
+                output_field=BooleanField(),
+            )
+        )
+
+    matches = Q()
+    for field in SEARCH_FIELDS:
+        matches |= Q(**{f"{field}__icontains": query})
+    return queryset.filter(matches)
+
+
+def event_facets(queryset):
+    """Category, price-range and date-window counts in a single aggregate."""
+    now = timezone.now()
+    today_end = now.replace(hour=23, minute=59, second=59, microsecond=999999)
+
+    aggregates = {
+        "category_free": Count("id", filter=Q(category="free")),
+        "category_paid": Count("id", filter=Q(category="paid")),
+        "price_free": Count("id", filter=Q(price__isnull=True) | Q(price=0)),
+        "date_today": Count("id", filter=Q(date__lte=today_end)),
+        "date_this_week": Count("id", filter=Q(date__lte=now + timedelta(days=7))),
+        "date_this_month": Count("id", filter=Q(date__lte=now + timedelta(days=30))),
+        "date_later": Count("id", filter=Q(date__gt=now + timedelta(days=30))),
+    }
+    for name, low, high in PRICE_BUCKETS:
+        bucket = Q(price__gte=low)
+        if high is not None:
+            bucket &= Q(price__lt=high)
+        aggregates[f"price_{name}"] = Count("id", filter=bucket)
+
+    counts = queryset.order_by().aggregate(**aggregates)
+
+    return {
+        "category": {
+            "free": counts["category_free"],
+            "paid": counts["category_paid"],
+        },
+        "price": {
+            "free": counts["price_free"],
+            **{name: counts[f"price_{name}"] for name, _, _ in PRICE_BUCKETS},
+        },
+        "date": {
+            "today": counts["date_today"],
+            "this_week": counts["date_this_week"],
+            "this_month": counts["date_this_month"],
+            "later": counts["date_later"],
+        },
+    }
@@ -1,10 +1,20 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import Event,EventRegistration
+from .images import build_variants, image_url
 
 
 class EventSerializer(serializers.ModelSerializer):
     host = serializers.ReadOnlyField(source="host.username")
     attendees_count = serializers.SerializerMethodField()
+
+    # Model columns behind each output field, for ?fields= projections
+    # (fields not listed read the column of the same name)
+    FIELD_COLUMNS = {
+        "host": ("host", "host__username"),
+        "image_variants": ("image", "image_variants"),
+        "attendees_count": (),
+    }
     class Meta:
         model = Event
         fields = [
@@ -13,10 +23,13 @@ class EventSerializer(serializers.ModelSerializer):
             "title",
             "description",
             "image",       # keep real field for upload
+            "image_status",
             "category",
             "upi_id",
             "place_name",
             "location",
+            "latitude",
+            "longitude",
             "date",
             "capacity",
             "price",
@@ -24,20 +37,47 @@ class EventSerializer(serializers.ModelSerializer):
             "created_at",
             "attendees_count"
         ]
-        read_only_fields = ["host", "approved", "created_at"]
+        read_only_fields = ["host", "approved", "created_at", "image_status"]
+
+    # Keys that ?fields= may ask for
+    OUTPUT_FIELDS = (*Meta.fields, "image_variants")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Sparse fieldset from the view (see events.fields)
+        self.requested_fields = self.context.get("fields")
+        if self.requested_fields is not None:
+            for name in set(self.fields) - self.requested_fields:
+                self.fields.pop(name)
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
+        wanted = self.requested_fields
 
-        # ✅ Convert CloudinaryField → URL
-        if instance.image:
-            data["image"] = instance.image.url
-        else:
-            data["image"] = None
+        # ✅ Convert CloudinaryField → URL (memoized per public id / version)
+        if wanted is None or "image" in wanted:
+            data["image"] = image_url(instance.image)
+        if wanted is None or "image_variants" in wanted:
+            data["image_variants"] = (
+                instance.image_variants or build_variants(instance.image)
+            )
 
         return data
+
+    def validate_image(self, value):
+        # Rejected here, before the poster is written anywhere or queued
+        if value is not None and getattr(value, "size", 0) > settings.POSTER_MAX_BYTES:
+            raise serializers.ValidationError(
+                f"Poster is too large (max {settings.POSTER_MAX_BYTES // (1024 * 1024)} MB)"
+            )
+        return value
+
     def get_attendees_count(self, obj):
+        # List endpoints annotate this via Event.objects.with_attendees_count()
+        if hasattr(obj, "attendees_count"):
+            return obj.attendees_count
         return EventRegistration.objects.filter(
             event=obj,
             is_approved=True
-        ).count()
\ No newline at end of file
+        ).count()
@@ -0,0 +1,46 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidate_event_cache
+from .models import Event, EventRegistration, PosterUpload, releasing_seats_in_bulk
+
+
+def _deleted_with_event(origin):
+    return isinstance(origin, Event) or getattr(origin, "model", None) is Event
+
+
+@receiver([post_save, post_delete], sender=Event)
+def invalidate_public_event_cache(sender, **kwargs):
+    invalidate_event_cache()
+
+
+# The public endpoints only see approved registrations (attendees_count), so
+# unpaid holds coming and going during an on-sale leave the cache warm.
+@receiver(post_save, sender=EventRegistration)
+def invalidate_on_approval_change(sender, instance, created, **kwargs):
+    before = False if created else getattr(instance, "_loaded_is_approved", None)
+    if instance.is_approved != before:
+        invalidate_event_cache()
+    instance._loaded_is_approved = instance.is_approved
+
+
+@receiver(post_delete, sender=EventRegistration)
+def release_registration_seat(sender, instance, origin=None, **kwargs):
+    # Deleting the event takes its counter (and its cache entries) with it,
+    # and the hold reaper returns a whole batch of seats in one UPDATE.
+    if _deleted_with_event(origin):
+        return
+    if instance.is_approved:
+        invalidate_event_cache()
+    if releasing_seats_in_bulk.get():
+        return
+    Event(id=instance.event_id).release_seat()
+
+
+# Processed, superseded and cascade-deleted uploads alike
+@receiver(post_delete, sender=PosterUpload)
+def delete_poster_upload_file(sender, instance, **kwargs):
+    storage, name = instance.file.storage, instance.file.name
+    if name:
+        transaction.on_commit(lambda: storage.delete(name))
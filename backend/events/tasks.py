@@ -0,0 +1,137 @@
+import logging
+import traceback
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------------
+# Database-backed task queue
+# ----------------------------------
+# enqueue() inserts a Task row in the caller's transaction, so a job is only
+# visible to workers once the request that created it commits. `manage.py
+# run_workers` claims rows with SELECT ... FOR UPDATE SKIP LOCKED and runs
+# them in a thread pool. A claimed task is leased until locked_until; if its
+# worker dies the lease runs out and another worker picks it up. Failures
+# are retried with exponential backoff up to max_attempts.
+#
+# Task.name is the dotted path of a module-level function; the payload is
+# passed to it as keyword arguments, so it must be JSON-serialisable. A task
+# that raises is retried; is_last_attempt() lets it clean up before the
+# final one.
+
+_current_task = ContextVar("current_task", default=None)
+
+
+def enqueue(name, max_attempts=5, delay=None, **payload):
+    run_after = timezone.now()
+    if delay:
+        run_after += delay
+    return Task.objects.create(
+        name=name, payload=payload, max_attempts=max_attempts, run_after=run_after
+    )
+
+
+def claim_tasks(limit, visibility_timeout=None):
+    """Lease up to `limit` runnable tasks to the calling worker."""
+    if visibility_timeout is None:
+        visibility_timeout = settings.TASK_VISIBILITY_TIMEOUT
+    now = timezone.now()
+
+    with transaction.atomic():
+        tasks = list(
+            Task.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status="queued", run_after__lte=now)
+                | Q(status="running", locked_until__lt=now)
+            )
+            .order_by("run_after", "id")[:limit]
+        )
+        if not tasks:
+            return []
+
+        locked_until = now + timedelta(seconds=visibility_timeout)
+        Task.objects.filter(id__in=[t.id for t in tasks]).update(
+            status="running",
+            attempts=F("attempts") + 1,
+            locked_until=locked_until,
+            updated_at=now,
+        )
+
+    for task in tasks:
+        task.status = "running"
+        task.attempts += 1
+        task.locked_until = locked_until
+    return tasks
+
+
+def retry_delay(attempts):
+    return min(
+        settings.TASK_RETRY_BACKOFF * 2 ** (attempts - 1),
+        settings.TASK_RETRY_BACKOFF_MAX,
+    )
+
+
+def is_last_attempt():
+    """Whether the running task won't be retried if it fails (True outside the queue)."""
+    task = _current_task.get()
+    return task is None or task.attempts >= task.max_attempts
+
+
+def run_task(task):
+    """Run a claimed task and record the outcome; returns the new status."""
+    close_old_connections()
+    token = _current_task.set(task)
+    try:
+        try:
+            import_string(task.name)(**task.payload)
+        except Exception:
+            logger.exception("Task %s #%s failed", task.name, task.id)
+            return _record_failure(task, traceback.format_exc())
+
+        _finish(task, status="done", locked_until=None, last_error="")
+        return "done"
+    finally:
+        _current_task.reset(token)
+        close_old_connections()
+
+
+def _record_failure(task, error):
+    if task.attempts >= task.max_attempts:
+        _finish(task, status="failed", locked_until=None, last_error=error)
+        return "failed"
+
+    _finish(
+        task,
+        status="queued",
+        locked_until=None,
+        last_error=error,
+        run_after=timezone.now() + timedelta(seconds=retry_delay(task.attempts)),
+    )
+    return "queued"
+
+
+def _finish(task, **fields):
+    # Matching on attempts ignores a worker that overran its lease: the task
+    # has been reclaimed since, and the newer attempt owns the row.
+    Task.objects.filter(id=task.id, attempts=task.attempts).update(
+        updated_at=timezone.now(), **fields
+    )
+
+
+def purge_tasks(older_than):
+    """Delete finished tasks last touched before `older_than`."""
+    deleted, _ = Task.objects.filter(
+        status__in=("done", "failed"), updated_at__lt=older_than
+    ).delete()
+    return deleted
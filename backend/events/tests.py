@@ -1,3 +1,1347 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import tempfile
+import threading
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import cloudinary
+from cloudinary import CloudinaryResource
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Q, Sum
+from django.test import (
+    AsyncClient,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import metrics
+from .analytics import STAT_FIELDS, rebuild_stats
+from .cache import VERSION_KEY
+from .geo import prefix_range
+from .holds import release_expired_holds
+from .images import VARIANTS, _build_url, build_variants, image_url
+from .imports import import_attendees
+from .live import InProcessBroker, get_broker
+from .models import (
+    Event,
+    EventDailyStats,
+    EventRegistration,
+    Payment,
+    PaymentWebhookEvent,
+    PosterUpload,
+    Task,
+)
+from .posters import LocalPosterStorage
+from .payments import FakeGateway
+from .views import MY_EVENT_FIELDS
+from .webhooks import apply_pending_webhooks, record_webhook
+
+
+def make_event(host, **fields):
+    defaults = {
+        "title": "Launch party",
+        "description": "Drinks and demos",
+        "category": "free",
+        "place_name": "Hall A",
+        "location": "Bengaluru",
+        "date": timezone.now() + timedelta(days=7),
+        "capacity": 50,
+        "approved": True,
+    }
+    defaults.update(fields)
+    return Event.objects.create(host=host, **defaults)
+
+
+class SeatCounterTests(TestCase):
+    def setUp(self):
+        self.host = User.objects.create_user("host", password="pw")
+        self.event = make_event(self.host, capacity=2)
+        self.client = APIClient()
+
+    def join(self, user):
+        self.client.force_authenticate(user)
+        return self.client.post(f"/api/events/events/{self.event.id}/join/")
+
+    def test_join_stops_at_capacity(self):
+        users = [User.objects.create_user(f"u{i}", password="pw") for i in range(3)]
+
+        self.assertEqual(self.join(users[0]).status_code, 200)
+        self.assertEqual(self.join(users[1]).status_code, 200)
+        response = self.join(users[2])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["error"], "Event is full")
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 2)
+
+    def test_deleting_a_registration_frees_its_seat(self):
+        user = User.objects.create_user("guest", password="pw")
+        self.join(user)
+
+        EventRegistration.objects.get(user=user).delete()
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 0)
+
+    def test_deleting_a_user_frees_their_seats(self):
+        other = make_event(self.host, capacity=5)
+        user = User.objects.create_user("guest", password="pw")
+        self.join(user)
+        self.client.post(f"/api/events/events/{other.id}/join/")
+
+        user.delete()
+
+        self.event.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.event.seats_taken, other.seats_taken), (0, 0))
+
+
+class ConcurrentJoinTests(TransactionTestCase):
+    def test_concurrent_claims_never_oversell(self):
+        host = User.objects.create_user("host", password="pw")
+        event = make_event(host, capacity=5)
+        claimed = []
+        start = threading.Barrier(20)
+
+        def claim():
+            try:
+                start.wait()
+                if Event(id=event.id).claim_seat():
+                    claimed.append(1)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=claim) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        event.refresh_from_db()
+        self.assertEqual(len(claimed), 5)
+        self.assertEqual(event.seats_taken, 5)
+
+
+class EventListQueryCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.host = User.objects.create_user("host", password="pw")
+        self.admin = User.objects.create_superuser("admin", password="pw")
+        self.client = APIClient()
+
+    def make_events(self, count, **fields):
+        guest = User.objects.create_user(f"guest{count}", password="pw")
+        for _ in range(count):
+            event = make_event(self.host, **fields)
+            EventRegistration.objects.create(
+                user=guest, event=event, is_paid=True, is_approved=True
+            )
+
+    def assert_constant_queries(self, url, **fields):
+        # Listing 5 or 500 events costs the same number of queries
+        for count in (5, 495):
+            self.make_events(count, **fields)
+            cache.clear()
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data[0]["attendees_count"], 1)
+        self.assertEqual(len(response.data), 500)
+
+    def test_event_list(self):
+        self.client.force_authenticate(self.host)
+        self.assert_constant_queries("/api/events/events/")
+
+    def test_pending_events(self):
+        self.client.force_authenticate(self.admin)
+        self.assert_constant_queries("/api/events/admin/events/pending/", approved=False)
+
+
+class HostedEventsTests(TestCase):
+    def setUp(self):
+        self.host = User.objects.create_user("host", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.host)
+
+        start = timezone.now().replace(hour=12) + timedelta(days=1)
+        self.events = [
+            make_event(self.host, title=f"Event {i}", date=start + timedelta(days=i))
+            for i in range(3)
+        ]
+        make_event(User.objects.create_user("other", password="pw"))
+
+        guests = [User.objects.create_user(f"guest{i}", password="pw") for i in range(3)]
+        first = self.events[0]
+        for guest, approved, scanned in zip(guests, (True, True, False), (True, False, False)):
+            EventRegistration.objects.create(
+                user=guest, event=first, is_approved=approved, is_scanned=scanned
+            )
+        for i, status in enumerate(("PAID", "PAID", "FAILED")):
+            Payment.objects.create(
+                user=guests[i], event=first, amount=10000,
+                razorpay_order_id=f"order_{i}", status=status,
+            )
+
+    def get(self, query=""):
+        response = self.client.get(f"/api/events/hosted/{query}")
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_counts_and_revenue_in_one_query(self):
+        with self.assertNumQueries(1):
+            data = self.get()
+
+        self.assertEqual([e["id"] for e in data], [e.id for e in reversed(self.events)])
+        first = data[-1]
+        self.assertEqual(
+            (first["attendees_count"], first["approved_count"], first["scanned_count"]),
+            (3, 2, 1),
+        )
+        self.assertEqual(first["revenue"], 20000)
+        self.assertEqual(data[0]["revenue"], 0)
+
+    def test_date_filters_are_inclusive_whole_days(self):
+        day = timezone.localdate(self.events[1].date).isoformat()
+
+        data = self.get(f"?from={day}&to={day}")
+
+        self.assertEqual([e["id"] for e in data], [self.events[1].id])
+        self.assertEqual(self.client.get("/api/events/hosted/?from=soon").status_code, 400)
+
+    def test_page_size_pages_the_dashboard(self):
+        first = self.get("?page_size=2")
+        self.assertEqual(first["count"], 3)
+        self.assertEqual(len(first["results"]), 2)
+
+        second = self.client.get(first["next"]).data
+        self.assertEqual(
+            [e["id"] for e in first["results"] + second["results"]],
+            [e.id for e in reversed(self.events)],
+        )
+        self.assertIsNone(second["next"])
+
+
+class EventAttendeesTests(TestCase):
+    def setUp(self):
+        self.host = User.objects.create_user("host", password="pw")
+        self.event = make_event(self.host)
+        for i in range(6):
+            EventRegistration.objects.create(
+                user=User.objects.create_user(f"{'vip' if i < 2 else 'guest'}{i}", password="pw"),
+                event=self.event,
+                is_paid=i % 2 == 0,
+                is_scanned=i < 3,
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.host)
+        self.url = f"/api/events/hosted/{self.event.id}/attendees/"
+
+    def usernames(self, query=""):
+        response = self.client.get(self.url + query)
+        self.assertEqual(response.status_code, 200)
+        return [a["username"] for a in response.data["attendees"]]
+
+    def test_filters(self):
+        self.assertEqual(self.usernames("?is_scanned=true"), ["vip0", "vip1", "guest2"])
+        self.assertEqual(self.usernames("?is_paid=false"), ["vip1", "guest3", "guest5"])
+        self.assertEqual(self.usernames("?is_scanned=1&is_paid=1"), ["vip0", "guest2"])
+        self.assertEqual(self.usernames("?username=VIP"), ["vip0", "vip1"])
+        self.assertEqual(self.client.get(self.url + "?is_paid=maybe").status_code, 400)
+
+    def test_cursor_pages_cost_one_query_each(self):
+        seen = []
+        url = self.url + "?page_size=4"
+        while url:
+            with self.assertNumQueries(2):  # the event, then the page
+                response = self.client.get(url)
+            seen += [a["username"] for a in response.data["attendees"]]
+            url = response.data["next"]
+
+        self.assertEqual(seen, self.usernames())
+
+    def test_other_hosts_cannot_read_the_roster(self):
+        self.client.force_authenticate(User.objects.create_user("other", password="pw"))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class MyEventsFieldsTests(TestCase):
+    def setUp(self):
+        host = User.objects.create_user("host", password="pw")
+        self.guest = User.objects.create_user("guest", password="pw")
+        self.events = [make_event(host, title=f"Event {i}") for i in range(2)]
+        for event in self.events:
+            EventRegistration.objects.create(user=self.guest, event=event, is_paid=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.guest)
+
+    def get(self, fields=None):
+        params = {"fields": fields} if fields else {}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/events/my-events/", params)
+        self.assertEqual(len(queries.captured_queries), 1)
+        return response, queries.captured_queries[0]["sql"]
+
+    def test_all_fields_by_default(self):
+        response, _ = self.get()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data[0]), set(MY_EVENT_FIELDS))
+        self.assertEqual(response.data[0]["title"], "Event 0")
+
+    def test_requested_fields_only(self):
+        response, sql = self.get("title,date")
+
+        self.assertEqual(set(response.data[0]), {"title", "date"})
+        self.assertIn('"events_event"."title"', sql)
+        self.assertNotIn('"events_event"."description"', sql)
+
+    def test_registration_fields_skip_the_event_join(self):
+        response, sql = self.get("event_id,is_paid")
+
+        self.assertEqual(response.data, [
+            {"event_id": event.id, "is_paid": True} for event in self.events
+        ])
+        self.assertNotIn("JOIN", sql.upper())
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get("/api/events/my-events/", {"fields": "title,secret"})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["error"], "Unknown fields: secret")
+
+
+class EventCursorPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.host = User.objects.create_user("host", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.host)
+
+        # Many events share a start time, so paging has to break ties on id
+        start = timezone.now() + timedelta(days=1)
+        for i in range(60):
+            make_event(self.host, date=start + timedelta(hours=i // 20))
+        self.expected = list(
+            Event.objects.order_by("date", "id").values_list("id", flat=True)
+        )
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, [q["sql"] for q in queries.captured_queries]
+
+    def test_walks_every_page_without_offsets(self):
+        seen = []
+        url = "/api/events/events/?page_size=7"
+        while url:
+            response, queries = self.get(url)
+            # Deep pages cost the same as the first: one LIMIT n+1 range scan
+            self.assertEqual(len(queries), 1)
+            self.assertNotIn("OFFSET", queries[0].upper())
+            self.assertIn("LIMIT 8", queries[0].upper())
+            seen += [event["id"] for event in response.data["results"]]
+            url = response.data["next"]
+
+        self.assertEqual(seen, self.expected)
+
+    def test_previous_link_returns_the_page_before(self):
+        first, _ = self.get("/api/events/events/?page_size=7")
+        second, _ = self.get(first.data["next"])
+        back, _ = self.get(second.data["previous"])
+
+        self.assertEqual(back.data["results"], first.data["results"])
+        self.assertIsNone(back.data["previous"])
+
+    def test_rejects_a_garbled_cursor(self):
+        response = self.client.get("/api/events/events/?page_size=7&cursor=cD1ub3BlfDE=")
+        self.assertEqual(response.status_code, 404)
+
+
+class PublicCacheInvalidationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.host = User.objects.create_user("host", password="pw")
+        self.guest = User.objects.create_user("guest", password="pw")
+        self.event = make_event(self.host, category="paid", price=100)
+        self.client = APIClient()
+        self.client.force_authenticate(self.guest)
+        self.client.get("/api/events/events/")
+
+    def version(self):
+        return cache.get(VERSION_KEY)["token"]
+
+    def test_unpaid_holds_keep_the_cache(self):
+        before = self.version()
+
+        self.client.post(f"/api/events/events/{self.event.id}/join/")
+        registration = EventRegistration.objects.get(user=self.guest)
+        registration.hold_expires_at = timezone.now()
+        registration.save()
+        registration.delete()
+
+        self.assertEqual(self.version(), before)
+
+    def test_approval_invalidates(self):
+        self.client.post(f"/api/events/events/{self.event.id}/join/")
+        before = self.version()
+
+        registration = EventRegistration.objects.get(user=self.guest)
+        registration.is_approved = True
+        registration.save()
+        self.assertNotEqual(self.version(), before)
+
+        before = self.version()
+        registration.delete()
+        self.assertNotEqual(self.version(), before)
+
+
+class IndexUsageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.host = User.objects.create_user("host", password="pw")
+        cls.event = make_event(cls.host)
+
+    def assertUsesIndex(self, queryset, index, sqlite=None):
+        # `sqlite` is what to expect there instead, for composite indexes
+        # led by a boolean that SQLite can only use the prefix of
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                # Test tables are tiny; make the planner show what it would
+                # pick for a large one
+                cursor.execute("SET LOCAL enable_seqscan = off")
+            plan = queryset.explain()
+        if connection.vendor == "sqlite" and sqlite:
+            index = sqlite
+        self.assertIn(index, plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_public_listing(self):
+        self.assertUsesIndex(
+            Event.objects.filter(approved=True, date__gte=timezone.now()).order_by("date", "id"),
+            "event_public_date_idx",
+        )
+
+    def test_pending_queue(self):
+        self.assertUsesIndex(
+            Event.objects.filter(approved=False).order_by("created_at", "id"),
+            "event_pending_created_idx",
+        )
+
+    def test_host_dashboard(self):
+        self.assertUsesIndex(
+            Event.objects.filter(host=self.host).order_by("-date"),
+            "event_host_date_idx",
+        )
+
+    def test_registration_counts(self):
+        self.assertUsesIndex(
+            EventRegistration.objects.filter(event=self.event, is_approved=True),
+            "reg_event_approved_idx",
+            sqlite="(event_id=?)",
+        )
+        self.assertUsesIndex(
+            EventRegistration.objects.filter(event=self.event, is_scanned=True),
+            "reg_event_scanned_idx",
+            sqlite="(event_id=?)",
+        )
+
+    def test_payment_order_lookup(self):
+        self.assertUsesIndex(
+            Payment.objects.filter(razorpay_order_id="order_1"),
+            "razorpay_order_id",
+        )
+
+
+class ScanQRBatchTests(TestCase):
+    def setUp(self):
+        self.host = User.objects.create_user("host", password="pw")
+        self.event = make_event(self.host)
+        guests = [User.objects.create_user(f"guest{i}", password="pw") for i in range(2)]
+        self.tickets = [
+            EventRegistration.objects.create(
+                user=guest, event=self.event, is_paid=True, is_approved=True
+            )
+            for guest in guests
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.host)
+
+    def test_impossible_timestamp_falls_back_to_now(self):
+        before = timezone.now()
+        response = self.client.post(
+            "/api/events/events/scan-qr/batch/",
+            {
+                "scans": [
+                    {"qr_token": str(self.tickets[0].qr_token), "scanned_at": "2024-13-45T10:00:00"},
+                    {"qr_token": str(self.tickets[1].qr_token), "scanned_at": "2024-05-01T10:00:00Z"},
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["checked_in"], 2)
+        self.tickets[0].refresh_from_db()
+        self.assertGreaterEqual(self.tickets[0].scanned_at, before)
+
+
+class RosterDeltaTests(TestCase):
+    def setUp(self):
+        self.host = User.objects.create_user("host", password="pw")
+        self.event = make_event(self.host)
+        self.client = APIClient()
+        self.client.force_authenticate(self.host)
+
+    def delta(self, since):
+        return self.client.get(
+            f"/api/events/hosted/{self.event.id}/roster/delta/", {"since": since}
+        )
+
+    def test_rejects_an_impossible_version(self):
+        response = self.delta("2024-13-45T10:00:00")
+        self.assertEqual(response.status_code, 400)
+
+    def test_includes_writes_stamped_just_before_the_snapshot(self):
+        guest = User.objects.create_user("guest", password="pw")
+        ticket = EventRegistration.objects.create(
+            user=guest, event=self.event, is_paid=True, is_approved=True
+        )
+        # Committed after the snapshot was taken, but stamped a moment before
+        snapshot = self.client.get(f"/api/events/hosted/{self.event.id}/roster/")
+        EventRegistration.objects.filter(id=ticket.id).update(
+            updated_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        response = self.delta(snapshot.data["version"])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(str(ticket.qr_token), [c["qr_token"] for c in response.data["changes"]])
+
+
+class PaidEventTestCase(TestCase):
+    def setUp(self):
+        self.gateway = FakeGateway()
+        patcher = mock.patch("events.payments._gateway", self.gateway)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.host = User.objects.create_user("host", password="pw")
+        self.guest = User.objects.create_user("guest", password="pw")
+        self.event = make_event(self.host, category="paid", price=100, capacity=1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.guest)
+
+    def join(self, user=None):
+        self.client.force_authenticate(user or self.guest)
+        response = self.client.post(f"/api/events/events/{self.event.id}/join/")
+        self.client.force_authenticate(self.guest)
+        return response
+
+    def create_order(self, registration_id):
+        return self.client.post(f"/api/events/payments/create/{registration_id}/")
+
+    def expire_holds(self):
+        EventRegistration.objects.filter(is_paid=False).update(
+            hold_expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+    def verify(self, order_id):
+        attempt = self.gateway.record_payment(order_id)
+        return self.client.post(
+            "/api/events/payments/verify/",
+            {
+                "razorpay_order_id": order_id,
+                "razorpay_payment_id": attempt["id"],
+                "razorpay_signature": self.gateway.sign(f"{order_id}|{attempt['id']}"),
+            },
+            format="json",
+        )
+
+    def revenue(self):
+        return EventDailyStats.objects.aggregate(total=Sum("revenue"))["total"] or 0
+
+    def seats_taken(self):
+        self.event.refresh_from_db()
+        return self.event.seats_taken
+
+
+class SeatHoldTests(PaidEventTestCase):
+    def test_reaper_frees_expired_holds(self):
+        self.join()
+        self.expire_holds()
+
+        self.assertEqual(release_expired_holds(), 1)
+        self.assertFalse(EventRegistration.objects.exists())
+        self.assertEqual(self.seats_taken(), 0)
+
+    def test_new_order_restarts_the_hold(self):
+        registration_id = self.join().data["registration_id"]
+        EventRegistration.objects.update(hold_expires_at=timezone.now() + timedelta(seconds=5))
+
+        self.assertEqual(self.create_order(registration_id).status_code, 200)
+
+        hold = EventRegistration.objects.get().hold_expires_at
+        self.assertGreater(hold, timezone.now() + timedelta(minutes=5))
+
+    def test_reaper_skips_holds_with_a_captured_payment(self):
+        order_id = self.create_order(self.join().data["registration_id"]).data["order_id"]
+        Payment.objects.filter(razorpay_order_id=order_id).update(status="PAID")
+        self.expire_holds()
+
+        self.assertEqual(release_expired_holds(), 0)
+        self.assertEqual(self.seats_taken(), 1)
+
+    def test_late_capture_rebooks_a_free_seat(self):
+        order_id = self.create_order(self.join().data["registration_id"]).data["order_id"]
+        self.expire_holds()
+        release_expired_holds()
+
+        response = self.verify(order_id)
+
+        self.assertEqual(response.status_code, 200)
+        registration = EventRegistration.objects.get(user=self.guest)
+        self.assertTrue(registration.is_paid and registration.is_approved)
+        self.assertEqual(Payment.objects.get().registration, registration)
+        self.assertEqual(self.seats_taken(), 1)
+        self.assertEqual(self.revenue(), 10000)
+
+    def test_late_capture_on_a_full_event_is_flagged_for_refund(self):
+        order_id = self.create_order(self.join().data["registration_id"]).data["order_id"]
+        self.expire_holds()
+        release_expired_holds()
+        self.join(User.objects.create_user("other", password="pw"))
+
+        response = self.verify(order_id)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Payment.objects.get().status, "REFUND_DUE")
+        self.assertFalse(EventRegistration.objects.filter(user=self.guest).exists())
+        self.assertEqual(self.seats_taken(), 1)
+        self.assertEqual(self.revenue(), 0)
+
+    def test_late_webhook_capture_rebooks_a_free_seat(self):
+        order_id = self.create_order(self.join().data["registration_id"]).data["order_id"]
+        self.expire_holds()
+        release_expired_holds()
+
+        record_webhook("evt_1", "payment.captured", {
+            "payload": {"payment": {"entity": {"id": "pay_1", "order_id": order_id}}},
+        })
+        apply_pending_webhooks()
+
+        self.assertTrue(EventRegistration.objects.get(user=self.guest).is_paid)
+        self.assertEqual(Payment.objects.get().status, "PAID")
+        self.assertEqual(self.revenue(), 10000)
+
+
+@override_settings(RAZORPAY_WEBHOOK_SECRET="whsec_test")
+class PaymentWebhookTests(PaidEventTestCase):
+    def setUp(self):
+        super().setUp()
+        registration_id = self.join().data["registration_id"]
+        self.order_id = self.create_order(registration_id).data["order_id"]
+
+    def deliver(self, event_id, event_type, payload=None, signature=None):
+        if payload is None:
+            payload = {"payload": {"payment": {"entity": {
+                "id": f"pay_{event_id}", "order_id": self.order_id,
+            }}}}
+        if isinstance(payload, dict):
+            payload = {"event": event_type, **payload}
+        body = json.dumps(payload)
+        return self.client.post(
+            "/api/events/payments/webhook/",
+            body,
+            content_type="application/json",
+            HTTP_X_RAZORPAY_EVENT_ID=event_id,
+            HTTP_X_RAZORPAY_SIGNATURE=signature or self.gateway.sign(body, "whsec_test"),
+        )
+
+    def test_capture_marks_the_registration_paid(self):
+        self.assertEqual(self.deliver("evt_1", "payment.captured").status_code, 200)
+
+        self.assertEqual(Payment.objects.get().status, "PAID")
+        self.assertTrue(EventRegistration.objects.get(user=self.guest).is_paid)
+        self.assertEqual(self.revenue(), 10000)
+
+    def test_duplicate_delivery_is_a_no_op(self):
+        self.deliver("evt_1", "payment.captured")
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.deliver("evt_1", "payment.captured").status_code, 200)
+
+        # Dropped at insert time; nothing left in the inbox to apply
+        updates = [q for q in queries.captured_queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(updates, [])
+
+        self.assertEqual(PaymentWebhookEvent.objects.count(), 1)
+        self.assertEqual(self.revenue(), 10000)
+
+    def test_bad_signature_is_rejected(self):
+        response = self.deliver("evt_1", "payment.captured", signature="forged")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(PaymentWebhookEvent.objects.exists())
+        self.assertEqual(Payment.objects.get().status, "CREATED")
+
+    def test_failed_then_captured_on_the_same_order(self):
+        self.deliver("evt_1", "payment.failed")
+        self.assertEqual(Payment.objects.get().status, "FAILED")
+
+        self.deliver("evt_2", "payment.captured")
+        self.assertEqual(Payment.objects.get().status, "PAID")
+
+        # A late failure for the first attempt doesn't undo the capture
+        self.deliver("evt_3", "payment.failed")
+        self.assertEqual(Payment.objects.get().status, "PAID")
+        self.assertEqual(self.revenue(), 10000)
+
+    def test_malformed_payloads_are_rejected(self):
+        bad_order = {"payload": {"payment": {"entity": {"order_id": 7}}}}
+        for payload in ([], {"payload": []}, bad_order):
+            response = self.deliver("evt_1", "payment.captured", payload)
+            self.assertEqual(response.status_code, 400, payload)
+        self.assertFalse(PaymentWebhookEvent.objects.exists())
+
+    def test_malformed_inbox_rows_do_not_block_the_batch(self):
+        record_webhook("evt_bad", "payment.captured", {"payload": []})
+        self.deliver("evt_1", "payment.captured")
+
+        pending = PaymentWebhookEvent.objects.filter(processed_at__isnull=True)
+        self.assertFalse(pending.exists())
+        self.assertEqual(Payment.objects.get().status, "PAID")
+
+
+class PaymentIdempotencyTests(PaidEventTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.registration_id = self.join().data["registration_id"]
+
+    def create_order(self, registration_id, key=None):
+        headers = {"HTTP_IDEMPOTENCY_KEY": key} if key else {}
+        return self.client.post(
+            f"/api/events/payments/create/{registration_id}/", **headers
+        )
+
+    def test_same_key_returns_the_same_order_without_a_gateway_call(self):
+        first = self.create_order(self.registration_id, key="k1")
+        second = self.create_order(self.registration_id, key="k1")
+
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data["order_id"], first.data["order_id"])
+        self.assertEqual(len(self.gateway.orders), 1)
+        self.assertEqual(metrics.snapshot(), {
+            metrics.PAYMENT_GATEWAY_CALLS: 1,
+            metrics.PAYMENT_GATEWAY_CALLS_AVOIDED: 1,
+        })
+
+    def test_key_reused_for_another_registration_is_rejected(self):
+        other = make_event(self.host, category="paid", price=100)
+        self.client.post(f"/api/events/events/{other.id}/join/")
+        other_id = EventRegistration.objects.get(event=other).id
+        self.create_order(self.registration_id, key="k1")
+
+        response = self.create_order(other_id, key="k1")
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(len(self.gateway.orders), 1)
+
+    def test_open_order_is_reused_inside_the_window_only(self):
+        first = self.create_order(self.registration_id)
+        again = self.create_order(self.registration_id)
+        self.assertEqual(again.data["order_id"], first.data["order_id"])
+
+        window = settings.PAYMENT_ORDER_REUSE_WINDOW
+        Payment.objects.update(created_at=timezone.now() - window - timedelta(seconds=1))
+        later = self.create_order(self.registration_id)
+
+        self.assertNotEqual(later.data["order_id"], first.data["order_id"])
+        self.assertEqual(metrics.snapshot(), {
+            metrics.PAYMENT_GATEWAY_CALLS: 2,
+            metrics.PAYMENT_GATEWAY_CALLS_AVOIDED: 1,
+        })
+
+
+class ReconcilePaymentsTests(PaidEventTestCase):
+    def reconcile(self):
+        call_command("reconcile_payments", "--min-age=0", stdout=io.StringIO())
+
+    def test_captured_order_marks_the_registration_paid(self):
+        order_id = self.create_order(self.join().data["registration_id"]).data["order_id"]
+        self.gateway.record_payment(order_id)
+
+        self.reconcile()
+
+        self.assertEqual(Payment.objects.get().status, "PAID")
+        self.assertTrue(EventRegistration.objects.get(user=self.guest).is_paid)
+        self.assertEqual(self.revenue(), 10000)
+
+    def test_orphaned_paid_payment_is_flagged_for_refund_when_full(self):
+        # A capture applied before late captures were handled: PAID, revenue
+        # booked, no registration, and the seat since taken by someone else
+        order_id = self.create_order(self.join().data["registration_id"]).data["order_id"]
+        self.expire_holds()
+        release_expired_holds()
+        self.join(User.objects.create_user("other", password="pw"))
+        payment = Payment.objects.get(razorpay_order_id=order_id)
+        Payment.objects.filter(id=payment.id).update(status="PAID")
+        EventDailyStats.objects.update(revenue=payment.amount)
+
+        self.reconcile()
+
+        self.assertEqual(Payment.objects.get(id=payment.id).status, "REFUND_DUE")
+        self.assertEqual(self.revenue(), 0)
+
+    def test_abandoned_orders_cost_a_constant_number_of_queries(self):
+        def abandon(count):
+            Payment.objects.bulk_create([
+                Payment(
+                    user=self.guest,
+                    event=self.event,
+                    razorpay_order_id=self.gateway.create_order(10000)["id"],
+                    amount=10000,
+                )
+                for _ in range(count)
+            ])
+            Payment.objects.update(created_at=timezone.now() - timedelta(days=2))
+            with CaptureQueriesContext(connection) as queries:
+                self.reconcile()
+            self.assertEqual(Payment.objects.filter(status="FAILED").count(), count)
+            Payment.objects.all().delete()
+            return len(queries)
+
+        self.assertEqual(abandon(2), abandon(20))
+
+
+class AnalyticsRollupTests(PaidEventTestCase):
+    def rows(self):
+        return list(
+            EventDailyStats.objects.order_by("event_id", "day").values_list(
+                "event_id", "day", *STAT_FIELDS
+            )
+        )
+
+    def checkout(self, user):
+        self.client.force_authenticate(user)
+        registration_id = self.join(user).data["registration_id"]
+        self.client.force_authenticate(user)
+        return self.create_order(registration_id).data["order_id"]
+
+    def test_incremental_rollup_matches_a_rebuild(self):
+        Event.objects.filter(id=self.event.id).update(capacity=5)
+        free = make_event(self.host, capacity=10)
+        guests = [User.objects.create_user(f"g{i}", password="pw") for i in range(4)]
+
+        # Free joins, a check-in and an import
+        for guest in guests[:2]:
+            self.client.force_authenticate(guest)
+            self.client.post(f"/api/events/events/{free.id}/join/")
+        self.client.force_authenticate(self.host)
+        ticket = EventRegistration.objects.get(user=guests[0], event=free)
+        self.client.post("/api/events/events/scan-qr/", {"qr_token": str(ticket.qr_token)})
+        list(import_attendees(free, [(1, guests[2].username)]))
+
+        # One payer in time, two abandoned holds, one of them captured late
+        self.verify(self.checkout(self.guest))
+        self.checkout(guests[0])
+        late_order = self.checkout(guests[1])
+        self.expire_holds()
+        release_expired_holds()
+        record_webhook("evt_late", "payment.captured", {
+            "payload": {"payment": {"entity": {"id": "pay_late", "order_id": late_order}}},
+        })
+        apply_pending_webhooks()
+
+        incremental = self.rows()
+        rebuild_stats()
+        self.assertEqual(self.rows(), incremental)
+
+        self.client.force_authenticate(self.host)
+        response = self.client.get(f"/api/events/hosted/{self.event.id}/analytics/")
+        totals = response.data["totals"]
+        # Every join counts, the late capture's rebooking included
+        self.assertEqual(totals["registrations"], 4)
+        self.assertEqual(totals["abandoned_holds"], 2)
+        self.assertEqual(totals["paid_registrations"], 2)
+        self.assertEqual(totals["paid_conversion"], 0.5)
+        self.assertEqual(self.seats_taken(), 2)
+
+
+class EventSearchTests(TestCase):
+    # The test database is built by running every migration, including the
+    # ones that make SQLite rebuild events_event and drop its FTS triggers
+    def setUp(self):
+        cache.clear()
+        self.host = User.objects.create_user("host", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.host)
+
+    def search(self, query):
+        response = self.client.get("/api/events/events/search/", {"q": query})
+        self.assertEqual(response.status_code, 200)
+        return [event["id"] for event in response.data["results"]]
+
+    def test_finds_created_and_edited_events(self):
+        event = make_event(self.host, title="Jazz night", place_name="Blue Frog")
+        self.assertEqual(self.search("jazz"), [event.id])
+        self.assertEqual(self.search("frog"), [event.id])
+
+        event.title = "Salsa social"
+        event.save()
+        self.assertEqual(self.search("salsa"), [event.id])
+        self.assertEqual(self.search("jazz"), [])
+
+        event.delete()
+        self.assertEqual(self.search("salsa"), [])
+
+
+class AttendeeImportTests(TestCase):
+    def setUp(self):
+        self.host = User.objects.create_user("host", email="host@example.com")
+        self.event = make_event(self.host, capacity=5, seats_taken=1)
+        self.users = [
+            User.objects.create_user(f"u{i}", email=f"u{i}@example.com") for i in range(6)
+        ]
+        EventRegistration.objects.create(user=self.users[5], event=self.event)
+        self.client = APIClient()
+        self.client.force_authenticate(self.host)
+        self.url = f"/api/events/hosted/{self.event.id}/attendees/import/"
+
+    def results(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [(r["identifier"], r["result"]) for r in response.data["results"]]
+
+    def assertSeatsMatchRows(self):
+        self.event.refresh_from_db()
+        self.assertEqual(
+            self.event.seats_taken,
+            EventRegistration.objects.filter(event=self.event).count(),
+        )
+
+    def test_csv_body_with_usernames_and_emails(self):
+        body = (
+            "identifier\nu0\nU1@Example.com\nu0\nu1\nnobody\n"
+            "host@example.com\n,\nu5\n"
+        )
+
+        response = self.client.post(self.url, body, content_type="text/csv")
+
+        self.assertEqual(self.results(response), [
+            ("u0", "registered"),
+            ("U1@Example.com", "registered"),
+            ("u0", "duplicate"),
+            ("u1", "duplicate"),
+            ("nobody", "not_found"),
+            ("host@example.com", "is_host"),
+            ("", "invalid"),
+            ("u5", "already_registered"),
+        ])
+        self.assertEqual(response.data["summary"]["registered"], 2)
+        self.assertTrue(EventRegistration.objects.get(user=self.users[1]).is_paid)
+        self.assertSeatsMatchRows()
+
+    def test_ndjson_upload(self):
+        upload = SimpleUploadedFile(
+            "guests.ndjson", b'"u0"\n{"email": "u2@example.com"}\n{"username": 7}\n'
+        )
+
+        response = self.client.post(self.url, {"file": upload})
+
+        self.assertEqual(self.results(response), [
+            ("u0", "registered"), ("u2@example.com", "registered"), ("", "invalid"),
+        ])
+        self.assertSeatsMatchRows()
+
+    def test_empty_body(self):
+        response = self.client.post(self.url, "", content_type="text/csv")
+        self.assertEqual(self.results(response), [])
+
+    def test_stops_at_capacity_across_batches(self):
+        rows = enumerate([u.username for u in self.users[:5]], start=1)
+
+        results = list(import_attendees(self.event, rows, batch_size=2))
+
+        self.assertEqual(
+            [r["result"] for r in results],
+            ["registered"] * 4 + ["full"],
+        )
+        self.assertSeatsMatchRows()
+        self.assertEqual(self.event.seats_taken, self.event.capacity)
+
+    def test_command_writes_a_report(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source, report = f"{tmp}/guests.csv", f"{tmp}/report.csv"
+            with open(source, "w") as f:
+                f.write("u0\nu3@example.com\nnobody\n")
+            out = io.StringIO()
+
+            call_command(
+                "import_attendees", self.event.id, source,
+                f"--report={report}", stdout=out,
+            )
+
+            with open(report) as f:
+                lines = f.read().splitlines()
+
+        self.assertEqual(lines, [
+            "row,identifier,result",
+            "1,u0,registered",
+            "2,u3@example.com,registered",
+            "3,nobody,not_found",
+        ])
+        self.assertIn("registered: 2", out.getvalue())
+        self.assertSeatsMatchRows()
+
+
+class NearbyEventsTests(TestCase):
+    LAT, LNG = 12.9716, 77.5946
+
+    def setUp(self):
+        self.host = User.objects.create_user("host", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.host)
+
+        # Due north of the centre: 0.01° of latitude is about 1.1 km
+        self.events = {
+            offset: make_event(
+                self.host, latitude=self.LAT + offset, longitude=self.LNG
+            )
+            for offset in (0.2, 0.01, 0.05, 4, 6)
+        }
+        make_event(self.host)  # no coordinates
+
+    def nearby(self, **params):
+        response = self.client.get(
+            "/api/events/events/nearby/", {"lat": self.LAT, "lng": self.LNG, **params}
+        )
+        self.assertEqual(response.status_code, 200)
+        return [event["id"] for event in response.data]
+
+    def ids(self, *offsets):
+        return [self.events[offset].id for offset in offsets]
+
+    def test_filters_by_radius_nearest_first(self):
+        self.assertEqual(self.nearby(), self.ids(0.01, 0.05))
+        self.assertEqual(self.nearby(radius_km=30), self.ids(0.01, 0.05, 0.2))
+
+        response = self.client.get(
+            "/api/events/events/nearby/", {"lat": self.LAT, "lng": self.LNG}
+        )
+        self.assertAlmostEqual(response.data[0]["distance_km"], 1.112, places=2)
+
+    def test_clamps_limit_and_radius(self):
+        self.assertEqual(self.nearby(limit=0), self.ids(0.01))
+        self.assertEqual(
+            self.nearby(limit=1000, radius_km=30), self.ids(0.01, 0.05, 0.2)
+        )
+        # Capped at NEARBY_MAX_RADIUS_KM: 445 km is in, 667 km is not
+        self.assertEqual(self.nearby(radius_km=10000), self.ids(0.01, 0.05, 0.2, 4))
+
+    def test_rejects_bad_coordinates(self):
+        bad = ({"lat": 91, "lng": 0}, {"lat": 0, "lng": -181}, {"lat": "x", "lng": 0}, {})
+        for params in bad:
+            response = self.client.get("/api/events/events/nearby/", params)
+            self.assertEqual(response.status_code, 400, params)
+
+    def test_geohash_cells_are_index_ranges(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.nearby()
+        sql = queries.captured_queries[-1]["sql"]
+        self.assertIn('"geohash" >=', sql)
+        self.assertNotIn("LIKE", sql.upper())
+
+        # A trailing "z" carries into the previous character
+        self.assertEqual(
+            prefix_range("tdrz"), Q(geohash__gte="tdrz", geohash__lt="tds")
+        )
+
+
+class ImageURLTests(TestCase):
+    def setUp(self):
+        cloud_name = cloudinary.config().cloud_name
+        cloudinary.config(cloud_name="test-cloud")
+        self.addCleanup(cloudinary.config, cloud_name=cloud_name)
+        _build_url.cache_clear()
+
+    def poster(self, version="1"):
+        return CloudinaryResource(
+            "events/poster", format="jpg", version=version, type="upload",
+            resource_type="image",
+        )
+
+    def test_urls_are_built_once_per_poster_version(self):
+        with mock.patch.object(
+            CloudinaryResource, "build_url", autospec=True,
+            side_effect=lambda resource, **options: f"url-{resource.version}",
+        ) as build_url:
+            self.assertEqual(image_url(self.poster()), "url-1")
+            image_url(self.poster())
+            build_variants(self.poster())
+            build_variants(self.poster())
+            self.assertEqual(build_url.call_count, 4)  # original + 3 variants
+
+            self.assertEqual(image_url(self.poster(version="2")), "url-2")
+            self.assertEqual(build_url.call_count, 5)
+
+    def test_variants(self):
+        variants = build_variants(self.poster())
+
+        self.assertEqual(set(variants), set(VARIANTS))
+        self.assertIn("w_200", variants["thumb"])
+        self.assertIn("/v1/events/poster.jpg", variants["full"])
+        self.assertEqual(build_variants(None), {})
+        self.assertIsNone(image_url(None))
+
+    def test_listing_serves_stored_variants(self):
+        host = User.objects.create_user("host", password="pw")
+        event = make_event(host, image=self.poster())
+        self.assertEqual(event.image_variants, build_variants(self.poster()))
+
+        # Served from the column, not rebuilt per request
+        stored = {name: f"https://cdn.example/{name}.jpg" for name in VARIANTS}
+        Event.objects.filter(id=event.id).update(image_variants=stored)
+        cache.clear()
+        client = APIClient()
+        client.force_authenticate(host)
+
+        with mock.patch("events.serializers.build_variants") as build:
+            response = client.get("/api/events/events/")
+
+        self.assertEqual(response.data[0]["image_variants"], stored)
+        build.assert_not_called()
+
+
+class LiveUpdatesTests(TestCase):
+    def setUp(self):
+        self.host = User.objects.create_user("host", password="pw")
+        self.guest = User.objects.create_user("guest", password="pw")
+        self.event = make_event(self.host, capacity=10)
+        EventDailyStats.objects.create(
+            event=self.event, day=timezone.localdate(), paid_registrations=3, revenue=30000
+        )
+        self.url = f"/api/events/events/{self.event.id}/live/"
+
+    def token(self, user):
+        return str(RefreshToken.for_user(user).access_token)
+
+    @asynccontextmanager
+    async def open_stream(self, user):
+        response = await AsyncClient().get(self.url, {"token": self.token(user)})
+        self.assertEqual(response.status_code, 200)
+        stream = aiter(response.streaming_content)
+        try:
+            yield stream
+        finally:
+            await stream.aclose()
+
+    async def next_message(self, stream):
+        chunk = await anext(stream)
+        event_line, data_line = chunk.decode().strip().split("\n")
+        return event_line.removeprefix("event: "), json.loads(data_line.removeprefix("data: "))
+
+    async def test_missing_or_invalid_token_is_rejected(self):
+        for params in ({}, {"token": "garbage"}):
+            response = await AsyncClient().get(self.url, params)
+            self.assertEqual(response.status_code, 401, params)
+
+    async def test_host_sees_host_only_fields(self):
+        async with self.open_stream(self.host) as stream:
+            self.assertEqual(await self.next_message(stream), ("snapshot", {
+                "capacity": 10, "seats_taken": 0,
+                "paid_registrations": 3, "checkins": 0, "revenue": 30000,
+            }))
+            get_broker().publish(
+                self.event.id, {"type": "delta", "data": {"seats_taken": 1, "revenue": 100}}
+            )
+            self.assertEqual(
+                await self.next_message(stream), ("delta", {"seats_taken": 1, "revenue": 100})
+            )
+
+    async def test_others_get_host_only_fields_stripped(self):
+        async with self.open_stream(self.guest) as stream:
+            self.assertEqual(
+                await self.next_message(stream),
+                ("snapshot", {"capacity": 10, "seats_taken": 0}),
+            )
+            broker = get_broker()
+            # A delta with nothing left to show is skipped altogether
+            broker.publish(self.event.id, {"type": "delta", "data": {"revenue": 100}})
+            broker.publish(
+                self.event.id, {"type": "delta", "data": {"seats_taken": 1, "checkins": 1}}
+            )
+            self.assertEqual(await self.next_message(stream), ("delta", {"seats_taken": 1}))
+
+    async def test_unapproved_event_is_hidden_from_others(self):
+        await Event.objects.filter(id=self.event.id).aupdate(approved=False)
+        response = await AsyncClient().get(self.url, {"token": self.token(self.guest)})
+        self.assertEqual(response.status_code, 404)
+
+
+class InProcessBrokerTests(SimpleTestCase):
+    async def test_overflowing_subscriber_gets_a_resync(self):
+        broker = InProcessBroker(queue_size=2)
+
+        async with broker.subscribe(1) as messages:
+            for seats in range(3):
+                broker.publish(1, {"type": "delta", "data": {"seats_taken": seats}})
+            await asyncio.sleep(0)
+
+            self.assertEqual(messages.get_nowait(), {"type": "resync", "data": {}})
+            self.assertTrue(messages.empty())
+
+        self.assertEqual(broker.subscriber_count(), 0)
+
+    async def test_publishes_only_to_the_events_subscribers(self):
+        broker = InProcessBroker()
+
+        async with broker.subscribe(1) as first, broker.subscribe(2) as second:
+            broker.publish(1, {"type": "delta", "data": {"seats_taken": 1}})
+            await asyncio.sleep(0)
+
+            self.assertEqual(first.qsize(), 1)
+            self.assertTrue(second.empty())
+
+
+class FlakyPosterStorage(LocalPosterStorage):
+    """Fails the first `failures` saves, like a Cloudinary outage."""
+
+    failures = 0
+
+    def save(self, path):
+        if FlakyPosterStorage.failures:
+            FlakyPosterStorage.failures -= 1
+            raise ConnectionError("storage unavailable")
+        return super().save(path)
+
+
+@override_settings(POSTER_STORAGE="events.tests.FlakyPosterStorage", TASK_RETRY_BACKOFF=0)
+class PosterPipelineTests(TransactionTestCase):
+    # run_workers runs tasks on its own threads and connections
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_override = override_settings(MEDIA_ROOT=media.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        # Stands in for the shared storage the web and worker processes use
+        self.uploads = FileSystemStorage(location=f"{media.name}/shared")
+        patcher = mock.patch.object(
+            PosterUpload._meta.get_field("file"), "storage", self.uploads
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        # Poster variant URLs are built locally but need a cloud name
+        cloud_name = cloudinary.config().cloud_name
+        cloudinary.config(cloud_name="test-cloud")
+        self.addCleanup(cloudinary.config, cloud_name=cloud_name)
+
+        FlakyPosterStorage.failures = 0
+        self.host = User.objects.create_user("host", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.host)
+
+    def create_event(self, poster, status=201):
+        response = self.client.post("/api/events/events/", {
+            "title": "Poster night",
+            "description": "With a poster",
+            "category": "free",
+            "place_name": "Hall A",
+            "location": "Bengaluru",
+            "date": (timezone.now() + timedelta(days=3)).isoformat(),
+            "image": SimpleUploadedFile("poster.png", poster, content_type="image/png"),
+        })
+        self.assertEqual(response.status_code, status)
+        if status != 201:
+            return response.data
+        return Event.objects.get(id=response.data["id"])
+
+    def stored_uploads(self):
+        if not self.uploads.exists("poster_uploads"):
+            return []
+        return self.uploads.listdir("poster_uploads")[1]
+
+    def png(self):
+        buffer = io.BytesIO()
+        Image.new("RGB", (3000, 1500), "red").save(buffer, "PNG")
+        return buffer.getvalue()
+
+    def run_workers(self):
+        call_command("run_workers", "--once", stdout=io.StringIO())
+
+    def test_upload_is_processed_by_the_worker(self):
+        event = self.create_event(self.png())
+        self.assertEqual(event.image_status, "pending")
+        self.assertEqual(PosterUpload.objects.count(), 1)
+        self.assertEqual(len(self.stored_uploads()), 1)
+
+        self.run_workers()
+
+        event.refresh_from_db()
+        self.assertEqual(event.image_status, "ready")
+        self.assertTrue(event.image_variants)
+        self.assertFalse(PosterUpload.objects.exists())
+        self.assertEqual(self.stored_uploads(), [])
+
+    @override_settings(POSTER_MAX_BYTES=1024)
+    def test_oversized_poster_is_rejected_before_queueing(self):
+        data = self.create_event(self.png() + b"\0" * 1024, status=400)
+
+        self.assertIn("image", data)
+        self.assertFalse(Event.objects.exists())
+        self.assertFalse(Task.objects.exists())
+        self.assertEqual(self.stored_uploads(), [])
+
+    def test_storage_errors_are_retried(self):
+        FlakyPosterStorage.failures = 2
+        event = self.create_event(self.png())
+
+        with self.assertLogs("events", level="WARNING"):
+            self.run_workers()
+
+        event.refresh_from_db()
+        self.assertEqual(event.image_status, "ready")
+        task = Task.objects.get()
+        self.assertEqual((task.status, task.attempts), ("done", 3))
+
+    def test_upload_is_kept_until_the_last_attempt_fails(self):
+        FlakyPosterStorage.failures = 100
+        event = self.create_event(self.png())
+
+        with self.assertLogs("events", level="WARNING"):
+            self.run_workers()
+
+        event.refresh_from_db()
+        self.assertEqual(event.image_status, "failed")
+        self.assertFalse(PosterUpload.objects.exists())
+        self.assertEqual(self.stored_uploads(), [])
+        task = Task.objects.get()
+        self.assertEqual((task.status, task.attempts), ("failed", task.max_attempts))
+
+    def test_unreadable_upload_fails_without_retrying(self):
+        event = self.create_event(b"not an image")
+
+        with self.assertLogs("events", level="WARNING"):
+            self.run_workers()
+
+        event.refresh_from_db()
+        self.assertEqual(event.image_status, "failed")
+        self.assertEqual(Task.objects.get().attempts, 1)
@@ -7,16 +7,25 @@ router.register("events", EventViewSet, basename="events")
 
 urlpatterns = [
     path("events/<int:event_id>/join/", join_event),
+    path("events/<int:event_id>/live/", event_live),
     path("payments/create/<int:registration_id>/", create_payment_order),
     path("payments/verify/", verify_payment),
+    path("payments/webhook/", payment_webhook),
 
     path("my-events/", my_events),
     path("hosted/", hosted_events),
+    path("hosted/analytics/", hosted_analytics),
     path("hosted/<int:event_id>/attendees/", event_attendees),
+    path("hosted/<int:event_id>/attendees/import/", import_event_attendees),
+    path("hosted/<int:event_id>/analytics/", event_analytics),
+    path("hosted/<int:event_id>/roster/", event_roster),
+    path("hosted/<int:event_id>/roster/delta/", event_roster_delta),
     path("events/scan-qr/", scan_qr),
+    path("events/scan-qr/batch/", scan_qr_batch),
 
     path("admin/events/pending/", pending_events),
     path("admin/events/<int:event_id>/approve/", approve_event),
+    path("admin/metrics/", metrics_snapshot),
 ]
 
 urlpatterns += router.urls
@@ -1,46 +1,218 @@
 from rest_framework import viewsets, status
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, IsAdminUser
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
+from rest_framework.decorators import action, api_view, authentication_classes, permission_classes
 from django.shortcuts import get_object_or_404
+from django.db import IntegrityError, transaction
+from django.db.models import (
+    Case,
+    Count,
+    DateTimeField,
+    IntegerField,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import AuthenticationFailed, ParseError
+from rest_framework_simplejwt.exceptions import InvalidToken
 from rest_framework.parsers import MultiPartParser, FormParser
 
-from .models import Event, EventRegistration, Payment
+from .models import Event, EventDailyStats, EventRegistration, Payment
 from .serializers import EventSerializer
+from .cache import cached_response
+from .pagination import (
+    AttendeeCursorPagination,
+    EventCursorPagination,
+    HostedEventsPagination,
+    PendingEventCursorPagination,
+)
 
-import razorpay
-from razorpay.errors import SignatureVerificationError
-
+from datetime import datetime, time
+from decimal import Decimal, InvalidOperation
+import asyncio
+import base64
+import hashlib
+import json
+import uuid
 
-# ----------------------------------
-# Razorpay Client
-# ----------------------------------
-client = razorpay.Client(
-    auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET)
-)
+from .payments import PaymentGatewayError, get_gateway
+from . import analytics, metrics
+from .holds import rebook_late_payment, release_expired_holds
+from .search import event_facets, search_events
+from .geo import haversine_km, nearby_filter
+from .images import build_variants, image_url
+from .imports import import_attendees, parse_csv, parse_ndjson
+from .live import HOST_ONLY_FIELDS, get_broker, visible_data
+from .fields import parse_fields, project
+from accounts.authentication import CachedJWTAuthentication
+from .posters import queue_poster
+from .webhooks import HANDLED_EVENTS, apply_pending_webhooks, payment_entity, record_webhook
 
 
 # ----------------------------------
 # EVENTS CRUD
 # ----------------------------------
+NEARBY_MAX_RADIUS_KM = 500
+NEARBY_MAX_RESULTS = 200
+
+
 class EventViewSet(viewsets.ModelViewSet):
     serializer_class = EventSerializer
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
+    pagination_class = EventCursorPagination
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+
+        # ?fields= only applies to reads; writes always work on full rows
+        self.sparse_fields = None
+        if request.method == "GET":
+            try:
+                self.sparse_fields = parse_fields(
+                    request, EventSerializer.OUTPUT_FIELDS
+                )
+            except ValueError as e:
+                raise ParseError(f"Unknown fields: {e}")
 
     def get_queryset(self):
-        return Event.objects.filter(
+        events = Event.objects.filter(
             approved=True,
             date__gte=timezone.now()
-        ).order_by("date")
+        ).order_by("date", "id")
+
+        fields = getattr(self, "sparse_fields", None)
+        if fields is None:
+            return events.select_related("host").with_attendees_count()
+
+        if "host" in fields:
+            events = events.select_related("host")
+        if "attendees_count" in fields:
+            events = events.with_attendees_count()
+
+        # The cursor paginator reads date; nearby measures from lat/lng
+        always = ["id", "date"]
+        if self.action == "nearby":
+            always += ["latitude", "longitude"]
+        return project(events, fields, EventSerializer.FIELD_COLUMNS, always)
+
+    def list(self, request, *args, **kwargs):
+        return cached_response(
+            request, lambda: super(EventViewSet, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return cached_response(
+            request,
+            lambda: super(EventViewSet, self).retrieve(request, *args, **kwargs),
+        )
 
     def perform_create(self, serializer):
-        serializer.save(host=self.request.user, approved=False)
+        # The poster is processed in the background; see events.posters
+        upload = serializer.validated_data.pop("image", None)
+        event = serializer.save(host=self.request.user, approved=False)
+        if upload:
+            queue_poster(event, upload)
+
+    def perform_update(self, serializer):
+        upload = serializer.validated_data.pop("image", None)
+        event = serializer.save()
+        if upload:
+            queue_poster(event, upload)
+
+    @action(detail=False, methods=["get"])
+    def nearby(self, request):
+        """
+        Approved upcoming events within ?radius_km= (default 10) of
+        ?lat=&lng=, nearest first, each with its distance_km.
+        """
+        try:
+            lat = float(request.query_params["lat"])
+            lng = float(request.query_params["lng"])
+            radius_km = float(request.query_params.get("radius_km", 10))
+            limit = int(request.query_params.get("limit", 50))
+        except (KeyError, ValueError):
+            return Response({"error": "lat and lng are required numbers"}, status=400)
+
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            return Response({"error": "lat/lng out of range"}, status=400)
+        radius_km = min(max(radius_km, 0.1), NEARBY_MAX_RADIUS_KM)
+        limit = min(max(limit, 1), NEARBY_MAX_RESULTS)
+
+        candidates = self.get_queryset().filter(nearby_filter(lat, lng, radius_km))
+
+        nearest = sorted(
+            (
+                (haversine_km(lat, lng, e.latitude, e.longitude), e)
+                for e in candidates
+            ),
+            key=lambda pair: pair[0],
+        )
+        nearest = [(d, e) for d, e in nearest if d <= radius_km][:limit]
+
+        data = self.get_serializer([e for _, e in nearest], many=True).data
+        for item, (distance, _) in zip(data, nearest):
+            item["distance_km"] = round(distance, 3)
+        return Response(data)
+
+    @action(detail=False, methods=["get"])
+    def search(self, request):
+        """
+        Full-text search over approved upcoming events.
+
+        ?q= searches title, description, place_name and location; category,
+        min_price / max_price and from / to narrow the results. Facet counts
+        are computed over the text matches before those narrowing filters.
+        """
+        query = request.query_params.get("q", "").strip()
+        events = self.get_queryset()
+        if query:
+            events = search_events(events, query)
+
+        facets = event_facets(events)
+
+        params = request.query_params
+        try:
+            if params.get("category"):
+                events = events.filter(category=params["category"])
+            if params.get("min_price"):
+                events = events.filter(price__gte=Decimal(params["min_price"]))
+            if params.get("max_price"):
+                events = events.filter(price__lte=Decimal(params["max_price"]))
+            if params.get("from"):
+                events = events.filter(date__gte=_parse_date_param(params["from"]))
+            if params.get("to"):
+                events = events.filter(
+                    date__lte=_parse_date_param(params["to"], end_of_day=True)
+                )
+        except (ValueError, InvalidOperation):
+            return Response({"error": "Invalid filter"}, status=400)
+
+        page = self.paginate_queryset(events)
+        if page is not None:
+            response = self.get_paginated_response(
+                self.get_serializer(page, many=True).data
+            )
+            response.data["facets"] = facets
+            return response
+
+        return Response({
+            "results": self.get_serializer(events, many=True).data,
+            "facets": facets,
+        })
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context.update({"request": self.request})
+        context["fields"] = getattr(self, "sparse_fields", None)
         return context
 
 # ----------------------------------
@@ -52,33 +224,57 @@ def join_event(request, event_id):
     user = request.user
     event = get_object_or_404(Event, id=event_id, approved=True)
 
-    if event.host == user:
+    if event.host_id == user.id:
         return Response({"error": "Host cannot join own event"}, status=400)
 
-    if EventRegistration.objects.filter(user=user, event=event).exists():
-        return Response({"error": "Already registered"}, status=400)
+    existing = EventRegistration.objects.filter(user=user, event=event).only(
+        "id", "is_paid", "hold_expires_at"
+    ).first()
+    if existing is not None:
+        if not existing.hold_expired:
+            return Response({"error": "Already registered"}, status=400)
+        # The user's own abandoned hold: free it so they can start over
+        release_expired_holds(event_id=event.id)
 
-    if EventRegistration.objects.filter(event=event).count() >= event.capacity:
-        return Response({"error": "Event is full"}, status=400)
+    # Claim the seat and insert the registration together, so a lost race on
+    # the unique (user, event) constraint gives the seat back.
+    try:
+        with transaction.atomic():
+            # A full event may still have seats tied up in expired holds
+            if not event.claim_seat() and not (
+                release_expired_holds(event_id=event.id) and event.claim_seat()
+            ):
+                return Response({"error": "Event is full"}, status=400)
 
-    # FREE EVENT
-    if event.category == "free":
-        EventRegistration.objects.create(
-            user=user,
-            event=event,
-            is_paid=True,
-            is_approved=True
-        )
-        return Response({"message": "Registered successfully"})
+            # FREE EVENT
+            if event.category == "free":
+                registration = EventRegistration.objects.create(
+                    user=user,
+                    event=event,
+                    is_paid=True,
+                    is_approved=True
+                )
+                analytics.record(
+                    event.id,
+                    registration.registered_at,
+                    registrations=1,
+                    paid_registrations=1,
+                )
+                return Response({"message": "Registered successfully"})
 
-    # PAID EVENT
-    registration = EventRegistration.objects.create(
-        user=user,
-        event=event
-    )
+            # PAID EVENT
+            registration = EventRegistration.objects.create(
+                user=user,
+                event=event,
+                hold_expires_at=timezone.now() + settings.SEAT_HOLD_TTL
+            )
+            analytics.record(event.id, registration.registered_at, registrations=1)
+    except IntegrityError:
+        return Response({"error": "Already registered"}, status=400)
 
     return Response({
         "registration_id": registration.id,
+        "hold_expires_at": registration.hold_expires_at,
         "message": "Proceed to payment"
     })
 
@@ -89,30 +285,85 @@ def join_event(request, event_id):
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def create_payment_order(request, registration_id):
-    registration = get_object_or_404(EventRegistration, id=registration_id)
+    registration = get_object_or_404(
+        EventRegistration.objects.select_related("event"),
+        id=registration_id,
+        user=request.user,
+    )
 
     if registration.is_paid:
         return Response({"error": "Already paid"}, status=400)
 
+    if registration.hold_expired:
+        return Response({"error": "Seat hold expired, please join again"}, status=400)
+
     amount = int(registration.event.price * 100)
+    idempotency_key = request.headers.get("Idempotency-Key")
 
-    order = client.order.create({
-        "amount": amount,
-        "currency": "INR",
-        "payment_capture": 1
-    })
+    # Retries and double-clicks get the order already on file instead of a
+    # fresh one from the gateway.
+    payment = None
+    if idempotency_key:
+        payment = Payment.objects.filter(
+            user=request.user, idempotency_key=idempotency_key
+        ).first()
+        if payment is not None and payment.registration_id != registration.id:
+            return Response(
+                {"error": "Idempotency-Key already used for another registration"},
+                status=422,
+            )
 
-    Payment.objects.create(
-        user=request.user,
-        event=registration.event,
-        razorpay_order_id=order["id"],
-        amount=amount
-    )
+    if payment is None:
+        payment = Payment.objects.filter(
+            registration=registration,
+            status="CREATED",
+            amount=amount,
+            created_at__gte=timezone.now() - settings.PAYMENT_ORDER_REUSE_WINDOW,
+        ).order_by("-created_at").first()
 
+    if payment is not None:
+        metrics.incr(metrics.PAYMENT_GATEWAY_CALLS_AVOIDED)
+        return _order_response(payment, registration)
+
+    # A new order restarts the hold, so the payer gets the full window to pay
+    # and the reaper can't free the seat mid-checkout. Conditional, so a hold
+    # the reaper is already taking isn't revived.
+    now = timezone.now()
+    if not EventRegistration.objects.filter(
+        id=registration.id, is_paid=False, hold_expires_at__gt=now
+    ).update(hold_expires_at=now + settings.SEAT_HOLD_TTL, updated_at=now):
+        return Response({"error": "Seat hold expired, please join again"}, status=400)
+
+    metrics.incr(metrics.PAYMENT_GATEWAY_CALLS)
+    try:
+        order = get_gateway().create_order(amount, currency="INR")
+    except PaymentGatewayError:
+        return Response({"error": "Payment gateway unavailable"}, status=502)
+
+    try:
+        with transaction.atomic():
+            payment = Payment.objects.create(
+                user=request.user,
+                event=registration.event,
+                registration=registration,
+                idempotency_key=idempotency_key or None,
+                razorpay_order_id=order["id"],
+                amount=amount
+            )
+    except IntegrityError:
+        # A concurrent request with the same key won the insert
+        payment = get_object_or_404(
+            Payment, user=request.user, idempotency_key=idempotency_key
+        )
+
+    return _order_response(payment, registration)
+
+
+def _order_response(payment, registration):
     return Response({
-        "order_id": order["id"],
-        "amount": amount,
-        "key": settings.RAZORPAY_KEY_ID,
+        "order_id": payment.razorpay_order_id,
+        "amount": payment.amount,
+        "key": get_gateway().key_id,
         "event_title": registration.event.title
     })
 
@@ -126,32 +377,109 @@ def verify_payment(request):
     data = request.data
 
     try:
-        client.utility.verify_payment_signature({
-            "razorpay_order_id": data["razorpay_order_id"],
-            "razorpay_payment_id": data["razorpay_payment_id"],
-            "razorpay_signature": data["razorpay_signature"],
-        })
-
-        payment = Payment.objects.get(
-            razorpay_order_id=data["razorpay_order_id"]
+        verified = get_gateway().verify_payment_signature(
+            data["razorpay_order_id"],
+            data["razorpay_payment_id"],
+            data["razorpay_signature"],
         )
-        payment.razorpay_payment_id = data["razorpay_payment_id"]
-        payment.razorpay_signature = data["razorpay_signature"]
-        payment.status = "PAID"
-        payment.save()
+    except KeyError:
+        verified = False
+
+    if not verified:
+        return Response({"error": "Payment verification failed"}, status=400)
+
+    payment = Payment.objects.get(
+        razorpay_order_id=data["razorpay_order_id"]
+    )
+
+    # Already confirmed (e.g. by the webhook, or a client retry)
+    if payment.status == "PAID":
+        return Response({"success": True})
+    if payment.status == "REFUND_DUE":
+        return _refund_due_response()
 
-        registration = EventRegistration.objects.get(
+    with transaction.atomic():
+        # Conditional, so a webhook confirming the same payment concurrently
+        # can't make it count twice
+        if not Payment.objects.filter(id=payment.id).exclude(
+            status__in=("PAID", "REFUND_DUE")
+        ).update(
+            razorpay_payment_id=data["razorpay_payment_id"],
+            razorpay_signature=data["razorpay_signature"],
+            status="PAID",
+        ):
+            return Response({"success": True})
+
+        registration = EventRegistration.objects.select_for_update().filter(
             user=request.user,
-            event=payment.event
+            event_id=payment.event_id
+        ).first()
+        if registration is None:
+            # The hold was reaped before the payment came through: rebook the
+            # seat if there is one left, otherwise owe a refund
+            if not rebook_late_payment(payment):
+                return _refund_due_response()
+            analytics.record(payment.event_id, payment.created_at, revenue=payment.amount)
+            return Response({"success": True})
+
+        stats = analytics.StatsDelta().add(
+            payment.event_id, payment.created_at, revenue=payment.amount
         )
+
+        if not registration.is_paid:
+            stats.add(payment.event_id, registration.registered_at, paid_registrations=1)
         registration.is_paid = True
         registration.is_approved = True
+        registration.hold_expires_at = None
         registration.save()
+        stats.apply()
 
-        return Response({"success": True})
+    return Response({"success": True})
 
-    except SignatureVerificationError:
-        return Response({"error": "Payment verification failed"}, status=400)
+
+def _refund_due_response():
+    return Response(
+        {"error": "Seat hold expired and the event is full; the payment will be refunded"},
+        status=409,
+    )
+
+
+# ----------------------------------
+# RAZORPAY WEBHOOK
+# ----------------------------------
+@api_view(["POST"])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def payment_webhook(request):
+    body = request.body
+    signature = request.META.get("HTTP_X_RAZORPAY_SIGNATURE", "")
+
+    if not settings.RAZORPAY_WEBHOOK_SECRET or not get_gateway().verify_webhook_signature(
+        body, signature, settings.RAZORPAY_WEBHOOK_SECRET
+    ):
+        return Response({"error": "Invalid signature"}, status=400)
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return Response({"error": "Invalid payload"}, status=400)
+    if not isinstance(payload, dict):
+        return Response({"error": "Invalid payload"}, status=400)
+
+    event_type = payload.get("event")
+    if event_type in HANDLED_EVENTS:
+        if payment_entity(payload) is None:
+            return Response({"error": "Invalid payload"}, status=400)
+        event_id = (
+            request.META.get("HTTP_X_RAZORPAY_EVENT_ID")
+            or hashlib.sha256(body).hexdigest()
+        )
+        record_webhook(event_id, event_type, payload)
+        # Apply at most one batch inline; a backlog is drained by
+        # `manage.py apply_payment_webhooks`.
+        apply_pending_webhooks(max_batches=1)
+
+    return Response({"status": "ok"})
 
 
 # ----------------------------------
@@ -160,60 +488,293 @@ def verify_payment(request):
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def my_events(request):
-    regs = EventRegistration.objects.filter(user=request.user).select_related("event")
+    try:
+        fields = parse_fields(request, MY_EVENT_FIELDS) or MY_EVENT_FIELDS.keys()
+    except ValueError as e:
+        return Response({"error": f"Unknown fields: {e}"}, status=400)
+
+    columns = {name: columns for name, (columns, _) in MY_EVENT_FIELDS.items()}
+    regs = EventRegistration.objects.filter(user=request.user)
+    # Join the event only for fields that read it; event_id is the FK column
+    if any(c.startswith("event__") for name in fields for c in columns[name]):
+        regs = regs.select_related("event")
+
+    regs = project(regs, fields, columns, always=("id", "event"))
 
     return Response([
         {
-            "event_id": r.event.id,
-            "title": r.event.title,
-            "image": r.event.image.url if r.event.image else None,
-            "date": r.event.date,
-            "category": r.event.category,
-            "place_name": r.event.place_name,
-            "location": r.event.location,
-            "is_paid": r.is_paid,
-            "is_approved": r.is_approved,
-            "qr_token": str(r.qr_token),
-            
+            name: value(r)
+            for name, (_, value) in MY_EVENT_FIELDS.items()
+            if name in fields
         }
         for r in regs
     ])
 
 
+# Output key → (columns read, value); ?fields= picks from these
+MY_EVENT_FIELDS = {
+    "event_id": ((), lambda r: r.event_id),
+    "title": (("event__title",), lambda r: r.event.title),
+    "image": (("event__image",), lambda r: image_url(r.event.image)),
+    "image_variants": (
+        ("event__image", "event__image_variants"),
+        lambda r: r.event.image_variants or build_variants(r.event.image),
+    ),
+    "date": (("event__date",), lambda r: r.event.date),
+    "category": (("event__category",), lambda r: r.event.category),
+    "place_name": (("event__place_name",), lambda r: r.event.place_name),
+    "location": (("event__location",), lambda r: r.event.location),
+    "is_paid": (("is_paid",), lambda r: r.is_paid),
+    "is_approved": (("is_approved",), lambda r: r.is_approved),
+    "qr_token": (("qr_token",), lambda r: str(r.qr_token)),
+}
+
+
 # ----------------------------------
 # HOSTED EVENTS
 # ----------------------------------
+def _parse_date_param(value, end_of_day=False):
+    """Accept an ISO datetime or a plain date (whole day) from a query param."""
+    # Dates first: parse_datetime also accepts "YYYY-MM-DD" (as midnight)
+    d = parse_date(value)
+    if d is not None:
+        dt = datetime.combine(d, time.max if end_of_day else time.min)
+    else:
+        dt = parse_datetime(value)
+        if dt is None:
+            raise ValueError(value)
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt)
+    return dt
+
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def hosted_events(request):
-    events = Event.objects.filter(host=request.user)
+    try:
+        fields = parse_fields(request, HOSTED_EVENT_FIELDS) or HOSTED_EVENT_FIELDS.keys()
+    except ValueError as e:
+        return Response({"error": f"Unknown fields: {e}"}, status=400)
 
-    return Response([
+    revenue = (
+        Payment.objects.filter(event=OuterRef("pk"), status="PAID")
+        .order_by()
+        .values("event")
+        .annotate(total=Sum("amount"))
+        .values("total")
+    )
+    # Each count joins the registrations table; only pay for those asked for
+    annotations = {
+        "attendees_count": Count("eventregistration"),
+        "approved_count": Count(
+            "eventregistration",
+            filter=Q(eventregistration__is_approved=True),
+        ),
+        "scanned_count": Count(
+            "eventregistration",
+            filter=Q(eventregistration__is_scanned=True),
+        ),
+        "revenue": Coalesce(Subquery(revenue, output_field=IntegerField()), 0),
+    }
+
+    events = project(
+        Event.objects.filter(host=request.user)
+        .annotate(**{name: annotations[name] for name in annotations if name in fields})
+        .order_by("-date", "-id"),
+        fields,
+        {name: columns for name, (columns, _) in HOSTED_EVENT_FIELDS.items()},
+    )
+
+    try:
+        if request.query_params.get("from"):
+            events = events.filter(
+                date__gte=_parse_date_param(request.query_params["from"])
+            )
+        if request.query_params.get("to"):
+            events = events.filter(
+                date__lte=_parse_date_param(request.query_params["to"], end_of_day=True)
+            )
+    except ValueError:
+        return Response({"error": "Invalid date filter"}, status=400)
+
+    paginator = HostedEventsPagination()
+    page = paginator.paginate_queryset(events, request)
+
+    data = [
         {
-            "id": e.id,
-            "title": e.title,
-            "image": e.image.url if e.image else None,  # ✅ FIX
-            "date": e.date,
-            "approved": e.approved,
-            "capacity":e.capacity,
-            "attendees_count": EventRegistration.objects.filter(event=e).count(),
+            name: value(e)
+            for name, (_, value) in HOSTED_EVENT_FIELDS.items()
+            if name in fields
         }
-        for e in events
-    ])
+        for e in (page if page is not None else events)
+    ]
+
+    if page is not None:
+        return paginator.get_paginated_response(data)
+    return Response(data)
+
+
+# Output key → (columns read, value); ?fields= picks from these
+HOSTED_EVENT_FIELDS = {
+    "id": (("id",), lambda e: e.id),
+    "title": (("title",), lambda e: e.title),
+    "image": (("image",), lambda e: image_url(e.image)),  # ✅ FIX
+    "image_variants": (
+        ("image", "image_variants"),
+        lambda e: e.image_variants or build_variants(e.image),
+    ),
+    "date": (("date",), lambda e: e.date),
+    "approved": (("approved",), lambda e: e.approved),
+    "capacity": (("capacity",), lambda e: e.capacity),
+    "attendees_count": ((), lambda e: e.attendees_count),
+    "approved_count": ((), lambda e: e.approved_count),
+    "scanned_count": ((), lambda e: e.scanned_count),
+    "revenue": ((), lambda e: e.revenue),  # paise
+}
+
+
+# ----------------------------------
+# HOST ANALYTICS (ROLLUPS)
+# ----------------------------------
+def _stats_day_filter(request, prefix=""):
+    """Q for ?from=/?to= (YYYY-MM-DD, inclusive) on EventDailyStats.day."""
+    day_filter = Q()
+    for param, lookup in (("from", "gte"), ("to", "lte")):
+        if request.query_params.get(param):
+            day = parse_date(request.query_params[param])
+            if day is None:
+                raise ValueError(param)
+            day_filter &= Q(**{f"{prefix}day__{lookup}": day})
+    return day_filter
+
+
+def _with_rates(totals):
+    registrations = totals["registrations"]
+    paid = totals["paid_registrations"]
+    return {
+        **totals,
+        "paid_conversion": round(paid / registrations, 4) if registrations else None,
+        "checkin_rate": round(totals["checkins"] / paid, 4) if paid else None,
+    }
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def hosted_analytics(request):
+    """Totals per hosted event (and overall), read from the daily rollup."""
+    try:
+        day_filter = _stats_day_filter(request, prefix="daily_stats__")
+    except ValueError:
+        return Response({"error": "Invalid date filter"}, status=400)
+
+    sums = {
+        field: Coalesce(Sum(f"daily_stats__{field}", filter=day_filter), 0)
+        for field in analytics.STAT_FIELDS
+    }
+    events = (
+        Event.objects.filter(host=request.user)
+        .annotate(**sums)
+        .values("id", "title", "date", *analytics.STAT_FIELDS)
+        .order_by("-date", "-id")
+    )
+
+    overall = dict.fromkeys(analytics.STAT_FIELDS, 0)
+    data = []
+    for e in events:
+        totals = {field: e[field] for field in analytics.STAT_FIELDS}
+        for field, value in totals.items():
+            overall[field] += value
+        data.append({
+            "event_id": e["id"],
+            "title": e["title"],
+            "date": e["date"],
+            **_with_rates(totals),  # revenue in paise
+        })
+
+    return Response({"totals": _with_rates(overall), "events": data})
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def event_analytics(request, event_id):
+    """Day-by-day rollup for one hosted event."""
+    event = get_object_or_404(
+        Event.objects.only("id", "title"), id=event_id, host=request.user
+    )
+
+    try:
+        day_filter = _stats_day_filter(request)
+    except ValueError:
+        return Response({"error": "Invalid date filter"}, status=400)
+
+    days = list(
+        EventDailyStats.objects.filter(day_filter, event=event)
+        .values("day", *analytics.STAT_FIELDS)
+        .order_by("day")
+    )
+    totals = {
+        field: sum(d[field] for d in days) for field in analytics.STAT_FIELDS
+    }
+
+    return Response({
+        "event_id": event.id,
+        "title": event.title,
+        "totals": _with_rates(totals),
+        "daily": days,
+    })
 
 
 
 # ----------------------------------
 # EVENT ATTENDEES (HOST)
 # ----------------------------------
+def _parse_bool_param(value):
+    value = value.lower()
+    if value in ("true", "1", "yes"):
+        return True
+    if value in ("false", "0", "no"):
+        return False
+    raise ValueError(value)
+
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def event_attendees(request, event_id):
-    event = get_object_or_404(Event, id=event_id, host=request.user)
+    event = get_object_or_404(
+        Event.objects.only("id", "title", "host_id"), id=event_id, host=request.user
+    )
 
-    regs = EventRegistration.objects.filter(event=event)
+    regs = (
+        EventRegistration.objects.filter(event=event)
+        .select_related("user")
+        .only(
+            "id",
+            "is_paid",
+            "is_approved",
+            "is_scanned",
+            "scanned_at",
+            "user__username",
+        )
+    )
 
-    return Response({
+    try:
+        for param in ("is_scanned", "is_paid"):
+            if request.query_params.get(param):
+                regs = regs.filter(
+                    **{param: _parse_bool_param(request.query_params[param])}
+                )
+    except ValueError:
+        return Response({"error": "Invalid boolean filter"}, status=400)
+
+    if request.query_params.get("username"):
+        regs = regs.filter(
+            user__username__istartswith=request.query_params["username"]
+        )
+
+    paginator = AttendeeCursorPagination()
+    page = paginator.paginate_queryset(regs, request)
+
+    data = {
         "event": event.title,
         "attendees": [
             {
@@ -223,9 +784,60 @@ def event_attendees(request, event_id):
                 "is_scanned": r.is_scanned,
                 "scanned_at": r.scanned_at,
             }
-            for r in regs
+            for r in (page if page is not None else regs.order_by("id").iterator())
         ]
-    })
+    }
+
+    if page is not None:
+        data["next"] = paginator.get_next_link()
+        data["previous"] = paginator.get_previous_link()
+    return Response(data)
+
+
+# ----------------------------------
+# BULK ATTENDEE IMPORT (HOST)
+# ----------------------------------
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/jsonl", "application/x-jsonlines")
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def import_event_attendees(request, event_id):
+    """
+    Issue comp tickets to a list of usernames / emails.
+
+    Send the list either as the raw request body (Content-Type text/csv or
+    application/x-ndjson) or as a multipart "file" (.csv / .ndjson / .jsonl).
+    It is read line by line, never loaded whole.
+    """
+    event = get_object_or_404(
+        Event.objects.only("id", "host_id"), id=event_id, host=request.user
+    )
+
+    content_type = request.content_type.split(";")[0].strip().lower()
+    if content_type == "multipart/form-data":
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"error": "file is required"}, status=400)
+        lines = upload
+        is_ndjson = upload.name.lower().endswith((".ndjson", ".jsonl")) or (
+            upload.content_type in NDJSON_CONTENT_TYPES
+        )
+    else:
+        # Read straight from the request body stream; request.data would
+        # buffer it all. No stream means an empty body.
+        lines = request.stream or ()
+        is_ndjson = content_type in NDJSON_CONTENT_TYPES
+
+    rows = parse_ndjson(lines) if is_ndjson else parse_csv(lines)
+
+    summary = {}
+    results = []
+    for result in import_attendees(event, rows):
+        summary[result["result"]] = summary.get(result["result"], 0) + 1
+        results.append(result)
+
+    return Response({"event_id": event.id, "summary": summary, "results": results})
 
 
 # ----------------------------------
@@ -237,21 +849,23 @@ def scan_qr(request):
     qr_token = request.data.get("qr_token")
 
     reg = get_object_or_404(
-        EventRegistration,
+        EventRegistration.objects.select_related("event", "user"),
         qr_token=qr_token,
         is_paid=True,
         is_approved=True
     )
 
-    if reg.event.host != request.user:
+    if reg.event.host_id != request.user.id:
         return Response({"error": "Not authorized"}, status=403)
 
-    if reg.is_scanned:
-        return Response({"error": "Already scanned"}, status=400)
-
-    reg.is_scanned = True
-    reg.scanned_at = timezone.now()
-    reg.save()
+    now = timezone.now()
+    with transaction.atomic():
+        # Conditional, so two gates scanning the same ticket check it in once
+        if reg.is_scanned or not EventRegistration.objects.filter(
+            id=reg.id, is_scanned=False
+        ).update(is_scanned=True, scanned_at=now, updated_at=now):
+            return Response({"error": "Already scanned"}, status=400)
+        analytics.record(reg.event_id, now, checkins=1)
 
     return Response({
         "message": "Attendance marked",
@@ -259,18 +873,297 @@ def scan_qr(request):
     })
 
 
+# ----------------------------------
+# BATCH SCAN QR (HOST)
+# ----------------------------------
+SCAN_BATCH_LIMIT = 500
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def scan_qr_batch(request):
+    """
+    Check in a batch of scans queued by a gate device.
+
+    Body: {"scans": [{"qr_token": "...", "scanned_at": "<ISO datetime>"}]}
+    Each scan gets a result of ok / already_scanned / not_authorized / unknown.
+    """
+    scans = request.data.get("scans")
+
+    if not isinstance(scans, list) or not scans:
+        return Response({"error": "scans must be a non-empty list"}, status=400)
+
+    if len(scans) > SCAN_BATCH_LIMIT:
+        return Response(
+            {"error": f"At most {SCAN_BATCH_LIMIT} scans per batch"}, status=400
+        )
+
+    now = timezone.now()
+    parsed = []
+    for item in scans:
+        item = item if isinstance(item, dict) else {}
+        try:
+            token = uuid.UUID(str(item.get("qr_token")))
+        except ValueError:
+            token = None
+
+        try:
+            scanned_at = parse_datetime(str(item.get("scanned_at") or "")) or now
+        except ValueError:
+            # Well-formed but impossible (e.g. month 13): same as no timestamp
+            scanned_at = now
+        if timezone.is_naive(scanned_at):
+            scanned_at = timezone.make_aware(scanned_at)
+
+        parsed.append((item.get("qr_token"), token, min(scanned_at, now)))
+
+    results = []
+    to_mark = {}
+
+    with transaction.atomic():
+        regs = {
+            r["qr_token"]: r
+            for r in EventRegistration.objects.select_for_update(of=("self",))
+            .filter(
+                qr_token__in=[t for _, t, _ in parsed if t is not None],
+                is_paid=True,
+                is_approved=True,
+            )
+            .values(
+                "id",
+                "qr_token",
+                "is_scanned",
+                "event_id",
+                "event__host_id",
+                "user__username",
+            )
+        }
+        event_ids = {r["id"]: r["event_id"] for r in regs.values()}
+
+        for raw, token, scanned_at in parsed:
+            reg = regs.get(token)
+
+            if reg is None:
+                result = "unknown"
+            elif reg["event__host_id"] != request.user.id:
+                result = "not_authorized"
+            elif reg["is_scanned"] or reg["id"] in to_mark:
+                result = "already_scanned"
+            else:
+                result = "ok"
+                to_mark[reg["id"]] = scanned_at
+
+            results.append({
+                "qr_token": raw,
+                "result": result,
+                "user": reg["user__username"] if reg and result != "not_authorized" else None,
+            })
+
+        if to_mark:
+            stats = analytics.StatsDelta()
+            for reg_id, scanned_at in to_mark.items():
+                stats.add(event_ids[reg_id], scanned_at, checkins=1)
+            stats.apply()
+
+            EventRegistration.objects.filter(
+                id__in=to_mark, is_scanned=False
+            ).update(
+                is_scanned=True,
+                updated_at=now,
+                scanned_at=Case(
+                    *[When(id=reg_id, then=Value(ts)) for reg_id, ts in to_mark.items()],
+                    output_field=DateTimeField(),
+                ),
+            )
+
+    return Response({"checked_in": len(to_mark), "results": results})
+
+
+# ----------------------------------
+# SCANNER ROSTER (HOST, OFFLINE SYNC)
+# ----------------------------------
+def _pack_tokens(tokens):
+    """Sorted, concatenated 16-byte UUIDs, base64 encoded (binary-searchable)."""
+    return base64.b64encode(b"".join(sorted(t.bytes for t in tokens))).decode()
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def event_roster(request, event_id):
+    """
+    Snapshot of the valid tickets for an event, for on-device scanning.
+
+    `tokens` holds tickets not yet checked in and `scanned` the ones that
+    are; both are sorted arrays of raw UUID bytes. Pass `version` back to
+    the delta endpoint to catch up later; it trails the snapshot by
+    ROSTER_SYNC_OVERLAP, so late-committing writes aren't missed.
+    """
+    event = get_object_or_404(Event.objects.only("id"), id=event_id, host=request.user)
+
+    version = timezone.now() - settings.ROSTER_SYNC_OVERLAP
+    rows = EventRegistration.objects.filter(
+        event=event, is_paid=True, is_approved=True
+    ).values_list("qr_token", "is_scanned")
+
+    tokens, scanned = [], []
+    for token, is_scanned in rows.iterator():
+        (scanned if is_scanned else tokens).append(token)
+
+    return Response({
+        "event_id": event.id,
+        "version": version.isoformat(),
+        "count": len(tokens) + len(scanned),
+        "tokens": _pack_tokens(tokens),
+        "scanned": _pack_tokens(scanned),
+    })
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def event_roster_delta(request, event_id):
+    event = get_object_or_404(Event.objects.only("id"), id=event_id, host=request.user)
+
+    # An unescaped "+" in the UTC offset arrives as a space
+    try:
+        since = parse_datetime(request.query_params.get("since", "").replace(" ", "+"))
+    except ValueError:
+        since = None
+    if since is None:
+        return Response({"error": "since must be a roster version"}, status=400)
+
+    version = timezone.now() - settings.ROSTER_SYNC_OVERLAP
+    changes = EventRegistration.objects.filter(
+        event=event, updated_at__gte=since
+    ).values_list("qr_token", "is_paid", "is_approved", "is_scanned")
+
+    return Response({
+        "event_id": event.id,
+        "version": version.isoformat(),
+        "changes": [
+            {
+                "qr_token": str(token),
+                "valid": is_paid and is_approved,
+                "is_scanned": is_scanned,
+            }
+            for token, is_paid, is_approved, is_scanned in changes.iterator()
+        ],
+    })
+
+
+# ----------------------------------
+# LIVE UPDATES (SERVER-SENT EVENTS, ASGI)
+# ----------------------------------
+def _live_access(event_id, raw_token):
+    """(visible, is_host) for the stream's viewer."""
+    auth = CachedJWTAuthentication()
+    user = auth.get_user(auth.get_validated_token(raw_token.encode()))
+
+    event = Event.objects.filter(id=event_id).only("id", "host_id", "approved").first()
+    is_host = event is not None and event.host_id == user.id
+    return event is not None and (event.approved or is_host), is_host
+
+
+def _live_snapshot(event_id, is_host):
+    event = Event.objects.only("id", "capacity", "seats_taken").get(id=event_id)
+    snapshot = {"capacity": event.capacity, "seats_taken": event.seats_taken}
+    if is_host:
+        snapshot.update(
+            EventDailyStats.objects.filter(event=event).aggregate(
+                **{
+                    field: Coalesce(Sum(field), 0)
+                    for field in HOST_ONLY_FIELDS
+                }
+            )
+        )
+    return snapshot
+
+
+def _sse(event_type, data):
+    return f"event: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+
+async def event_live(request, event_id):
+    """
+    Server-Sent Events stream of seat / payment / check-in changes.
+
+    Sends a "snapshot" first, then "delta" events to add to it; "resync"
+    means updates were dropped and the client should reconnect. Authenticate
+    with ?token=<access token>, as EventSource can't set headers. The event's
+    host also gets paid_registrations, checkins and revenue.
+    Needs an ASGI server.
+    """
+    if request.method != "GET":
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+    if not request.GET.get("token"):
+        return JsonResponse({"error": "token is required"}, status=401)
+
+    try:
+        visible, is_host = await sync_to_async(_live_access)(
+            event_id, request.GET.get("token")
+        )
+    except (InvalidToken, AuthenticationFailed):
+        return JsonResponse({"error": "Invalid token"}, status=401)
+    if not visible:
+        return JsonResponse({"error": "Not found"}, status=404)
+
+    broker = get_broker()
+
+    async def stream():
+        # Subscribe before reading the snapshot so no delta falls in between
+        # (one committed in that window may be both counted and sent).
+        async with broker.subscribe(event_id) as messages:
+            snapshot = await sync_to_async(_live_snapshot)(event_id, is_host)
+            yield _sse("snapshot", snapshot)
+            while True:
+                try:
+                    message = await asyncio.wait_for(
+                        messages.get(), timeout=settings.LIVE_KEEPALIVE
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+
+                data = visible_data(message, is_host)
+                if data or message["type"] != "delta":
+                    yield _sse(message["type"], data)
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
 # ----------------------------------
 # ADMIN
 # ----------------------------------
 @api_view(["GET"])
 @permission_classes([IsAdminUser])
 def pending_events(request):
-    events = Event.objects.filter(approved=False)
+    events = (
+        Event.objects.filter(approved=False)
+        .select_related("host")
+        .with_attendees_count()
+        .order_by("created_at", "id")
+    )
+
+    paginator = PendingEventCursorPagination()
+    page = paginator.paginate_queryset(events, request)
+    if page is not None:
+        return paginator.get_paginated_response(
+            EventSerializer(page, many=True, context={"request": request}).data
+        )
+
     return Response(
     EventSerializer(events, many=True, context={"request": request}).data
 )
 
 
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def metrics_snapshot(request):
+    return Response(metrics.snapshot())
+
+
 @api_view(["POST"])
 @permission_classes([IsAdminUser])
 def approve_event(request, event_id):
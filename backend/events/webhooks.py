@@ -0,0 +1,146 @@
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .analytics import StatsDelta
+from .cache import invalidate_event_cache
+from .holds import rebook_late_payment
+from .models import EventRegistration, Payment, PaymentWebhookEvent
+
+
+# ----------------------------------
+# Razorpay webhook ingestion
+# ----------------------------------
+# Deliveries are written to the PaymentWebhookEvent inbox first (unique on
+# the Razorpay event id, so retries are dropped at insert time) and applied
+# later in batches: one read per table and one bulk_update per table,
+# however many captures arrive together.
+
+HANDLED_EVENTS = ("payment.captured", "payment.failed")
+
+
+def record_webhook(event_id, event_type, payload):
+    """Store a delivery in the inbox; a repeated event id is silently ignored."""
+    PaymentWebhookEvent.objects.bulk_create(
+        [PaymentWebhookEvent(event_id=event_id, event_type=event_type, payload=payload)],
+        ignore_conflicts=True,
+    )
+
+
+def apply_pending_webhooks(batch_size=500, max_batches=None):
+    """Apply unprocessed inbox rows; returns how many were consumed."""
+    applied = 0
+    batches = 0
+
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            inbox = list(
+                PaymentWebhookEvent.objects.select_for_update(skip_locked=True)
+                .filter(processed_at__isnull=True)
+                .order_by("received_at", "id")[:batch_size]
+            )
+            if not inbox:
+                break
+            _apply_batch(inbox)
+
+        applied += len(inbox)
+        batches += 1
+        if len(inbox) < batch_size:
+            break
+
+    if applied:
+        invalidate_event_cache()
+    return applied
+
+
+def payment_entity(payload):
+    """The payment entity of a webhook payload, or None if it isn't shaped like one."""
+    try:
+        entity = payload["payload"]["payment"]["entity"]
+    except (KeyError, TypeError):
+        return None
+    if not isinstance(entity, dict) or not isinstance(entity.get("order_id"), str):
+        return None
+    if not isinstance(entity.get("id", ""), str):
+        return None
+    return entity
+
+
+def _apply_batch(inbox):
+    now = timezone.now()
+
+    entities = {d.id: payment_entity(d.payload) for d in inbox}
+    order_ids = {e["order_id"] for e in entities.values() if e is not None}
+    payments = {
+        p.razorpay_order_id: p
+        # Locked so a concurrent verify_payment can't confirm the same order
+        for p in Payment.objects.select_for_update().filter(
+            razorpay_order_id__in=order_ids
+        )
+    }
+    stats = StatsDelta()
+
+    changed = {}
+    for delivery in inbox:
+        # Malformed rows are marked processed with the rest, not retried
+        entity = entities[delivery.id]
+        if entity is None:
+            continue
+        payment = payments.get(entity["order_id"])
+
+        # Captures are terminal: a late payment.failed for an earlier attempt
+        # on the same order must not undo one.
+        if payment is None or payment.status in ("PAID", "REFUND_DUE"):
+            continue
+
+        if delivery.event_type == "payment.captured":
+            payment.status = "PAID"
+            payment.razorpay_payment_id = entity.get("id")
+        elif delivery.event_type == "payment.failed":
+            payment.status = "FAILED"
+        changed[payment.id] = payment
+
+    if changed:
+        Payment.objects.bulk_update(
+            changed.values(), ["status", "razorpay_payment_id"]
+        )
+
+    paid = [p for p in changed.values() if p.status == "PAID"]
+    if paid:
+        registrations = list(
+            EventRegistration.objects.select_for_update().filter(
+                reduce(or_, (Q(user_id=p.user_id, event_id=p.event_id) for p in paid))
+            )
+        )
+        registered = {(r.user_id, r.event_id) for r in registrations}
+        for payment in paid:
+            # The hold was reaped before the capture arrived
+            if (payment.user_id, payment.event_id) not in registered:
+                if rebook_late_payment(payment):
+                    registered.add((payment.user_id, payment.event_id))
+
+        registrations = [r for r in registrations if not r.is_paid]
+        for registration in registrations:
+            stats.add(
+                registration.event_id, registration.registered_at, paid_registrations=1
+            )
+            registration.is_paid = True
+            registration.is_approved = True
+            registration.hold_expires_at = None
+            registration.updated_at = now
+        EventRegistration.objects.bulk_update(
+            registrations, ["is_paid", "is_approved", "hold_expires_at", "updated_at"]
+        )
+
+        for payment in paid:
+            if payment.status == "PAID":
+                stats.add(payment.event_id, payment.created_at, revenue=payment.amount)
+
+    stats.apply()
+
+    PaymentWebhookEvent.objects.filter(
+        id__in=[d.id for d in inbox]
+    ).update(processed_at=now)